@@ -0,0 +1,60 @@
+"""Benchmarks on the real-world shapefiles in ``examples/``. These are skipped
+when the shapefiles are not available."""
+
+import maup
+
+from .common import example, quiet
+
+
+class ExampleBlocksAndPrecincts:
+    timeout = 1800
+
+    def setup(self):
+        quiet()
+        self.blocks = example("blocks")
+        self.precincts = example("new_precincts")
+        self.columns = ["TOTPOP", "BVAP", "WVAP", "HISP"]
+
+    def time_assign(self):
+        maup.assign(self.blocks, self.precincts)
+
+    def peakmem_assign(self):
+        maup.assign(self.blocks, self.precincts)
+
+    def time_prorate(self):
+        pieces = maup.intersections(self.blocks, self.precincts, area_cutoff=0)
+        weights = self.blocks["TOTPOP"] / self.blocks["TOTPOP"].sum()
+        weights = maup.normalize(weights.reindex(pieces.index, level=0), level=0)
+        maup.prorate(pieces, self.blocks[self.columns], weights)
+
+    def peakmem_prorate(self):
+        pieces = maup.intersections(self.blocks, self.precincts, area_cutoff=0)
+        weights = self.blocks["TOTPOP"] / self.blocks["TOTPOP"].sum()
+        weights = maup.normalize(weights.reindex(pieces.index, level=0), level=0)
+        maup.prorate(pieces, self.blocks[self.columns], weights)
+
+    def time_adjacencies(self):
+        maup.adjacencies(self.blocks)
+
+    def peakmem_adjacencies(self):
+        maup.adjacencies(self.blocks)
+
+    def time_doctor(self):
+        maup.doctor(self.blocks, self.precincts, silent=True)
+
+    def peakmem_doctor(self):
+        maup.doctor(self.blocks, self.precincts, silent=True)
+
+
+class ExampleSmartRepair:
+    timeout = 3600
+
+    def setup(self):
+        quiet()
+        self.precincts = example("new_precincts")
+
+    def time_smart_repair(self):
+        maup.smart_repair(self.precincts)
+
+    def peakmem_smart_repair(self):
+        maup.smart_repair(self.precincts)
@@ -0,0 +1,95 @@
+"""Benchmarks for moving data between two sets of units: blocks on a grid and
+precincts from a Voronoi tiling of the same extent."""
+
+import maup
+
+from .common import quiet, sources_and_targets
+
+
+class Assign:
+    params = [1_000, 10_000, 100_000, 1_000_000]
+    param_names = ["sources"]
+    timeout = 1800
+
+    def setup(self, n):
+        quiet()
+        self.sources, self.targets = sources_and_targets(n)
+
+    def time_assign(self, n):
+        maup.assign(self.sources, self.targets)
+
+    def peakmem_assign(self, n):
+        maup.assign(self.sources, self.targets)
+
+
+class Intersections:
+    params = ([1_000, 10_000, 100_000, 1_000_000], ["geoseries", "areas"])
+    param_names = ["sources", "output_type"]
+    timeout = 1800
+
+    def setup(self, n, output_type):
+        quiet()
+        self.sources, self.targets = sources_and_targets(n)
+
+    def time_intersections(self, n, output_type):
+        maup.intersections(self.sources, self.targets, output_type=output_type)
+
+    def peakmem_intersections(self, n, output_type):
+        maup.intersections(self.sources, self.targets, output_type=output_type)
+
+
+class ProrateAndNormalize:
+    params = [1_000, 10_000, 100_000, 1_000_000]
+    param_names = ["sources"]
+    timeout = 1800
+
+    def setup(self, n):
+        quiet()
+        # Disaggregate the precincts' votes down to the pieces, weighted by the
+        # population of the blocks.
+        self.blocks, self.precincts = sources_and_targets(n)
+        self.pieces = maup.intersections(
+            self.precincts, self.blocks, output_type="areas", area_cutoff=0
+        )
+        self.assignment = maup.assign(self.blocks, self.precincts)
+        self.weights = self.blocks["population"] / self.assignment.map(
+            self.blocks["population"].groupby(self.assignment).sum()
+        )
+
+    def time_normalize(self, n):
+        maup.normalize(self.pieces, level=0)
+
+    def peakmem_normalize(self, n):
+        maup.normalize(self.pieces, level=0)
+
+    def time_prorate(self, n):
+        maup.prorate(self.pieces, self.precincts["votes"], maup.normalize(self.pieces))
+
+    def peakmem_prorate(self, n):
+        maup.prorate(self.pieces, self.precincts["votes"], maup.normalize(self.pieces))
+
+    def time_prorate_by_assignment(self, n):
+        maup.prorate(self.assignment, self.precincts["votes"], self.weights)
+
+    def peakmem_prorate_by_assignment(self, n):
+        maup.prorate(self.assignment, self.precincts["votes"], self.weights)
+
+
+class Adjacencies:
+    params = (
+        [1_000, 10_000, 100_000, 1_000_000],
+        ["rook", "queen"],
+        ["geoseries", "edges"],
+    )
+    param_names = ["geometries", "adjacency_type", "output_type"]
+    timeout = 1800
+
+    def setup(self, n, adjacency_type, output_type):
+        quiet()
+        _, self.precincts = sources_and_targets(n, units_per_target=1)
+
+    def time_adjacencies(self, n, adjacency_type, output_type):
+        maup.adjacencies(self.precincts, adjacency_type, output_type)
+
+    def peakmem_adjacencies(self, n, adjacency_type, output_type):
+        maup.adjacencies(self.precincts, adjacency_type, output_type)
@@ -0,0 +1,100 @@
+"""Benchmarks for the repair functions, on a grid whose squares have been
+jittered so that neighbors overlap and leave gaps between them."""
+
+import maup
+from maup.smart_repair import (
+    building_blocks,
+    construct_hole_boundaries,
+    convexify_hole_boundaries,
+    drop_bad_holes,
+    reconstruct_from_overlap_tower,
+)
+
+from .common import gappy_grid, grid, messy_grid, quiet, voronoi
+
+
+class QuickRepairs:
+    params = [1_000, 10_000, 100_000]
+    param_names = ["geometries"]
+    timeout = 3600
+
+    def setup(self, n):
+        quiet()
+        self.geometries = messy_grid(n).geometry
+
+    def time_close_gaps(self, n):
+        maup.close_gaps(self.geometries)
+
+    def peakmem_close_gaps(self, n):
+        maup.close_gaps(self.geometries)
+
+    def time_resolve_overlaps(self, n):
+        maup.resolve_overlaps(self.geometries)
+
+    def peakmem_resolve_overlaps(self, n):
+        maup.resolve_overlaps(self.geometries)
+
+    def time_quick_repair(self, n):
+        maup.quick_repair(self.geometries)
+
+    def peakmem_quick_repair(self, n):
+        maup.quick_repair(self.geometries)
+
+
+class Doctor:
+    params = ([1_000, 10_000, 100_000, 1_000_000], [False, True])
+    param_names = ["geometries", "with_target"]
+    timeout = 3600
+
+    def setup(self, n, with_target):
+        quiet()
+        self.source = grid(n)
+        self.target = grid(n) if with_target else None
+
+    def time_doctor(self, n, with_target):
+        maup.doctor(self.source, self.target, silent=True)
+
+    def peakmem_doctor(self, n, with_target):
+        maup.doctor(self.source, self.target, silent=True)
+
+
+class SmartRepair:
+    params = [1_000, 10_000]
+    param_names = ["geometries"]
+    timeout = 3600
+
+    def setup(self, n):
+        quiet()
+        self.geometries = messy_grid(n)
+
+    def time_smart_repair(self, n):
+        maup.smart_repair(self.geometries)
+
+    def peakmem_smart_repair(self, n):
+        maup.smart_repair(self.geometries)
+
+
+class HoleBookkeeping:
+    """The steps of smart_repair that collect rows about gaps one at a time, on a
+    grid with a gap at (almost) every corner, so about as many gaps as squares."""
+
+    params = [1_000, 4_000, 16_000]
+    param_names = ["geometries"]
+    timeout = 3600
+
+    def setup(self, n):
+        quiet()
+        self.gappy = gappy_grid(n)
+        self.regions = voronoi(max(n // 100, 2), tuple(self.gappy.total_bounds))
+        overlap_tower, holes = building_blocks(self.gappy)
+        self.geometries = reconstruct_from_overlap_tower(self.gappy, overlap_tower)
+        self.holes, _, _ = drop_bad_holes(self.geometries, holes, 0.1)
+
+    def time_construct_hole_boundaries(self, n):
+        construct_hole_boundaries(self.geometries, self.holes)
+
+    def time_convexify_hole_boundaries(self, n):
+        convexify_hole_boundaries(self.geometries, self.holes)
+
+    def time_building_blocks_in_regions(self, n):
+        building_blocks(self.gappy, nest_within_regions=self.regions)
@@ -0,0 +1,118 @@
+"""Synthetic geometries for the benchmarks.
+
+Everything is generated locally from a fixed seed, so every run of the suite
+sees the same data. The tilings live in a unit-ish projected CRS so that the
+repair functions' default thresholds make sense.
+"""
+
+import functools
+import os
+import warnings
+
+import geopandas
+import numpy
+import shapely
+
+CRS = "EPSG:5070"
+SEED = 2024
+
+# The example shapefiles in the repo, for the optional real-world cases.
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+
+def quiet():
+    """Silences the warnings maup raises about islands, overlaps and unassigned
+    units, which the synthetic data triggers on purpose."""
+    warnings.simplefilter("ignore")
+
+
+@functools.lru_cache(maxsize=None)
+def grid(n):
+    """A square grid of about ``n`` unit squares, indexed 0..n-1."""
+    side = int(numpy.ceil(numpy.sqrt(n)))
+    x, y = numpy.divmod(numpy.arange(n), side)
+    cells = shapely.box(x, y, x + 1, y + 1)
+    return geopandas.GeoDataFrame(
+        {"population": numpy.random.default_rng(SEED).integers(0, 100, n)},
+        geometry=cells,
+        crs=CRS,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def voronoi(n, bounds):
+    """A Voronoi tiling of the rectangle ``bounds`` (a tuple ``(minx, miny, maxx,
+    maxy)``) into ``n`` cells around random sites, indexed 0..n-1."""
+    rng = numpy.random.default_rng(SEED + n)
+    minx, miny, maxx, maxy = bounds
+    sites = shapely.multipoints(
+        numpy.column_stack(
+            [rng.uniform(minx, maxx, size=n), rng.uniform(miny, maxy, size=n)]
+        )
+    )
+    bounds = shapely.box(*bounds)
+    cells = shapely.get_parts(shapely.voronoi_polygons(sites, extend_to=bounds))
+    cells = shapely.intersection(cells, bounds)
+    return geopandas.GeoDataFrame(
+        {"votes": rng.integers(0, 1000, len(cells))}, geometry=cells, crs=CRS
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def sources_and_targets(n, units_per_target=25):
+    """A grid of ``n`` sources (like blocks) and a Voronoi tiling of the same
+    extent into about ``n / units_per_target`` targets (like precincts), so that
+    the sources mostly nest in the targets but some are split between them."""
+    sources = grid(n)
+    bounds = tuple(float(value) for value in sources.total_bounds)
+    targets = voronoi(max(n // units_per_target, 2), bounds)
+    return sources, targets
+
+
+@functools.lru_cache(maxsize=None)
+def messy_grid(n, jitter=0.05):
+    """A grid of ``n`` squares whose corners are moved by up to ``jitter`` in each
+    direction, independently for each square, so that neighbors overlap and
+    leave gaps between them the way real-world shapefiles do."""
+    rng = numpy.random.default_rng(SEED + 1)
+    cells = grid(n)
+    bounds = cells.bounds.to_numpy()
+    bounds += rng.uniform(-jitter, jitter, size=bounds.shape)
+    messy = cells.copy()
+    messy.geometry = shapely.box(*bounds.T)
+    return messy
+
+
+@functools.lru_cache(maxsize=None)
+def gappy_grid(n, cut=0.2):
+    """A grid of ``n`` squares with each of their corners cut off by a random
+    amount up to ``cut``, so that neighbors still share most of an edge but every
+    interior corner of the grid is a small gap between four squares."""
+    rng = numpy.random.default_rng(SEED + 2)
+    cells = grid(n)
+    x0, y0, x1, y1 = cells.bounds.to_numpy().T
+    c = rng.uniform(cut / 4, cut, size=(4, len(cells)))
+    coords = numpy.stack(
+        [
+            [x0 + c[0], y0],
+            [x1 - c[1], y0],
+            [x1, y0 + c[1]],
+            [x1, y1 - c[2]],
+            [x1 - c[2], y1],
+            [x0 + c[3], y1],
+            [x0, y1 - c[3]],
+            [x0, y0 + c[0]],
+        ]
+    ).transpose(2, 0, 1)
+    gappy = cells.copy()
+    gappy.geometry = shapely.polygons(coords)
+    return gappy
+
+
+def example(name):
+    """Reads one of the shapefiles in ``examples/``, or skips the benchmark (by
+    raising NotImplementedError, as asv expects) if it is not there."""
+    path = os.path.join(EXAMPLES_DIR, name + ".zip")
+    if not os.path.exists(path):
+        raise NotImplementedError(name + " is not available")
+    return geopandas.read_file("zip://" + path).to_crs(CRS)
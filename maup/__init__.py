@@ -14,6 +14,8 @@ from .repair import (
 )
 from .smart_repair import smart_repair
 from .normalize import normalize
+from .weight_matrix import WeightMatrix
+from .crosswalk import Crosswalk
 from .progress_bar import progress
 
 # warn about https://github.com/geopandas/geopandas/issues/2199
@@ -41,5 +43,7 @@ __all__ = [
     "doctor",
     "smart_repair",
     "normalize",
+    "WeightMatrix",
+    "Crosswalk",
     "progress",
 ]
@@ -1,10 +1,13 @@
 import warnings
 
+import numpy
+import pandas
+import shapely
 from geopandas import GeoSeries, GeoDataFrame
 from shapely import make_valid
 
+from .coordinates import boundary_segment_endpoints
 from .indexed_geometries import IndexedGeometries, get_geometries
-from .progress_bar import progress
 
 
 class OverlapWarning(UserWarning):
@@ -15,15 +18,167 @@ class IslandWarning(UserWarning):
     pass
 
 
-def iter_adjacencies(geometries):
+def adjacency_pairs(geometries, n_jobs=None):
+    """Finds every pair of intersecting geometries with a single self-join of the
+    spatial index, and computes all of their intersections in one vectorized call.
+    Returns a tuple ``(first, second, intersections)`` of arrays, where ``first``
+    and ``second`` are the positions of the two geometries of each pair and the
+    label of ``first`` is always less than the label of ``second``.
+    """
+    indexed = IndexedGeometries(geometries)
+    first, second, inters = indexed.intersection_pairs(
+        indexed.geometries, n_jobs=n_jobs, ranks=label_ranks(indexed.index)
+    )
+    order = numpy.lexsort((second, first))
+    return first[order], second[order], inters[order]
+
+
+def adjacency_measures(geometries, n_jobs=None, batch_size=100_000):
+    """Like :func:`adjacency_pairs`, but returns the length and the area of each
+    intersection instead of its geometry, as a tuple ``(first, second, lengths,
+    areas)`` of arrays. The intersections are computed ``batch_size`` at a time
+    and thrown away as soon as they are measured.
+    """
     indexed = IndexedGeometries(geometries)
-    for i, geometry in progress(indexed.geometries.items(), len(indexed.geometries)):
-        possible = indexed.query(geometry)
-        possible = possible[possible.index > i]
-        inters = possible.intersection(geometry)
-        inters = inters[-(inters.is_empty | inters.isna())]
-        for j, inter in inters.items():
-            yield (i, j), inter
+    first, second, values = indexed.intersection_measures(
+        indexed.geometries,
+        ("length", "area"),
+        batch_size=batch_size,
+        n_jobs=n_jobs,
+        ranks=label_ranks(indexed.index),
+    )
+    order = numpy.lexsort((second, first))
+    return first[order], second[order], values[order, 0], values[order, 1]
+
+
+def boundary_segments(geometries, snap_magnitude=None):
+    """Breaks the boundaries of the polygons in ``geometries`` into their individual
+    line segments, all at once (see
+    :func:`~maup.coordinates.boundary_segment_endpoints`, which also does the
+    snapping to a grid of size 10^``snap_magnitude``, if it is given). Returns a
+    DataFrame with one row per segment, with the segment's endpoints in columns
+    ``x0, y0, x1, y1`` and the position of the geometry it came from in column
+    ``owner``. Zero-length segments (from repeated vertices) are left out.
+    """
+    owners, start, end = boundary_segment_endpoints(
+        numpy.asarray(get_geometries(geometries)), snap_magnitude
+    )
+    nondegenerate = (start != end).any(axis=1)
+
+    return pandas.DataFrame(
+        {
+            "x0": start[nondegenerate, 0],
+            "y0": start[nondegenerate, 1],
+            "x1": end[nondegenerate, 0],
+            "y1": end[nondegenerate, 1],
+            "owner": owners[nondegenerate],
+        }
+    )
+
+
+def arc_adjacency_pairs(geometries, adjacency_type="rook", snap_magnitude=None):
+    """Finds the adjacencies of a clean coverage (one without gaps or overlaps,
+    whose neighbors share their vertices) without computing any intersections.
+    Every boundary segment is hashed by its endpoints, and geometries that share a
+    segment are rook neighbors; for queen adjacency, geometries that share a vertex
+    are neighbors too. The endpoints are snapped to a grid of size
+    10^``snap_magnitude`` first, if it is given (see :func:`boundary_segments`).
+
+    Returns a tuple ``(first, second, lengths, shared)``, where ``lengths`` is the
+    total length of the segments shared by each pair, and ``shared`` is a
+    DataFrame of the shared segments (see :func:`boundary_segments`) and, for
+    queen adjacency, the shared vertices of the pairs that share no segment (as
+    segments of length zero), with the number of their pair in column ``pair``.
+    """
+    ranks = label_ranks(get_geometries(geometries).index)
+    segments = boundary_segments(geometries, snap_magnitude)
+    shared = _pairs_sharing(segments, ["x0", "y0", "x1", "y1"], ranks)
+    shared["length"] = numpy.hypot(
+        shared["x1"] - shared["x0"], shared["y1"] - shared["y0"]
+    )
+
+    if adjacency_type == "queen":
+        vertices = pandas.concat(
+            [
+                segments[["x0", "y0", "owner"]],
+                segments[["x1", "y1", "owner"]].set_axis(["x0", "y0", "owner"], axis=1),
+            ]
+        )
+        corners = _pairs_sharing(vertices, ["x0", "y0"], ranks)
+        corners = corners.merge(
+            shared[["first", "second"]].drop_duplicates(),
+            how="left",
+            indicator=True,
+        )
+        corners = corners[corners["_merge"] == "left_only"].drop(columns="_merge")
+        corners = corners.assign(x1=corners["x0"], y1=corners["y0"], length=0.0)
+        shared = pandas.concat([shared, corners], ignore_index=True)
+
+    edges = shared.groupby(["first", "second"])["length"].sum()
+    shared["pair"] = edges.index.get_indexer(
+        pandas.MultiIndex.from_frame(shared[["first", "second"]])
+    )
+    return (
+        edges.index.get_level_values("first").to_numpy(),
+        edges.index.get_level_values("second").to_numpy(),
+        edges.to_numpy(),
+        shared.drop(columns=["first", "second", "length"]),
+    )
+
+
+def _pairs_sharing(table, keys, ranks):
+    """Matches up the rows of ``table`` that have the same values in ``keys`` but
+    different owners, with the owner of lower rank in ``first``."""
+    table = table.drop_duplicates(keys + ["owner"])
+    table = table[table.duplicated(keys, keep=False)]
+    pairs = table.merge(table[keys + ["owner"]], on=keys, suffixes=("_first", ""))
+    pairs = pairs[ranks[pairs["owner_first"]] < ranks[pairs["owner"]]]
+    return pairs.rename(columns={"owner_first": "first", "owner": "second"})[
+        keys + ["first", "second"]
+    ]
+
+
+def arc_geometries(shared, num_pairs):
+    """Merges the shared segments of each pair found by
+    :func:`arc_adjacency_pairs` into a (Multi)LineString, or for pairs that only
+    share vertices, collects the vertices into a (Multi)Point."""
+    points = shared["x0"].eq(shared["x1"]) & shared["y0"].eq(shared["y1"])
+    lines, corners = shared[~points], shared[points]
+
+    geometries = numpy.empty(num_pairs, dtype="object")
+    if len(lines):
+        has_lines, pairs = numpy.unique(lines["pair"], return_inverse=True)
+        order = numpy.argsort(pairs, kind="stable")
+        segments = shapely.linestrings(
+            numpy.stack(
+                [lines[["x0", "y0"]].to_numpy(), lines[["x1", "y1"]].to_numpy()],
+                axis=1,
+            )
+        )
+        merged = shapely.multilinestrings(segments[order], indices=pairs[order])
+        geometries[has_lines] = shapely.line_merge(merged)
+    if len(corners):
+        has_corners, pairs = numpy.unique(corners["pair"], return_inverse=True)
+        order = numpy.argsort(pairs, kind="stable")
+        vertices = shapely.points(corners[["x0", "y0"]].to_numpy())
+        collected = shapely.multipoints(vertices[order], indices=pairs[order])
+        single = shapely.get_num_geometries(collected) == 1
+        collected[single] = shapely.get_geometry(collected[single], 0)
+        geometries[has_corners] = collected
+    return geometries
+
+
+def label_ranks(index):
+    """Ranks the labels of ``index``, so that the pairs (i, j) with i < j can be
+    picked out with a NumPy mask on positions."""
+    ranks, _ = pandas.factorize(index, sort=True)
+    return ranks
+
+
+def iter_adjacencies(geometries, n_jobs=None):
+    labels = get_geometries(geometries).index
+    first, second, inters = adjacency_pairs(geometries, n_jobs=n_jobs)
+    yield from zip(zip(labels[first], labels[second]), inters)
 
 
 def adjacencies(
@@ -32,7 +187,10 @@ def adjacencies(
     output_type="geoseries",
     *,
     warn_for_overlaps=True,
-    warn_for_islands=True
+    warn_for_islands=True,
+    method="intersections",
+    snap_magnitude=None,
+    n_jobs=None,
 ):
     """Returns adjacencies between geometries.
     The default return type is a
@@ -43,33 +201,78 @@ def adjacencies(
     If output_type == "geodataframe", the return type is a range-indexed GeoDataFrame
     with a "neighbors" column containing the pair (i,j) for the geometry consisting
     of the intersection between geometry `i` and geometry `j`.
+    If output_type == "edges", the return type is a `~pandas.Series` of floats with
+    the same `MultiIndex` as the GeoSeries, whose (i, j)th entry is the length of
+    the boundary shared by `i` and `j`. The intersection geometries are never
+    kept in memory, which makes this the cheapest option for building an
+    adjacency graph.
+
+    If ``n_jobs`` is more than 1, the intersections are computed in that many
+    processes (``-1`` uses all of the CPUs). See :func:`~maup.intersections`.
+
+    With method == "arcs", no intersections are computed at all: the neighbors
+    are found by matching up the boundary segments of the geometries (see
+    :func:`arc_adjacency_pairs`), which takes close to linear time. This is only
+    correct for clean coverages, e.g. the output of :func:`~maup.smart_repair`
+    or geometries that pass :func:`~maup.doctor`, where neighbors share their
+    vertices. Overlaps are not detected by this method.
 
+    If ``snap_magnitude`` is given (only with method == "arcs"), the vertices are
+    rounded to the nearest multiple of 10^snap_magnitude before they are matched
+    up, so that copies of a vertex that differ by floating point noise still
+    match. The returned geometries and lengths are made of the rounded vertices.
+    Method "arcs" always runs in a single process, and raises a ValueError if
+    ``n_jobs`` asks for more than one.
     """
     if adjacency_type not in ["rook", "queen"]:
         raise ValueError('adjacency_type must be "rook" or "queen"')
+    if method not in ["intersections", "arcs"]:
+        raise ValueError('method must be "intersections" or "arcs"')
+    if method == "arcs" and n_jobs not in (None, 1):
+        raise ValueError('n_jobs cannot be used with method="arcs"')
+    if method != "arcs" and snap_magnitude is not None:
+        raise ValueError('snap_magnitude can only be used with method="arcs"')
 
     orig_crs = geometries.crs
     geometries = get_geometries(geometries)
     geometries = make_valid(geometries)
 
-    adjs = list(iter_adjacencies(geometries))
-    if adjs:
-        index, geoms = zip(*adjs)
+    if method == "arcs":
+        first, second, lengths, shared = arc_adjacency_pairs(
+            geometries, adjacency_type, snap_magnitude
+        )
+        areas = numpy.zeros(len(lengths))
+        if output_type != "edges":
+            geoms = arc_geometries(shared, len(lengths))
+    elif output_type == "edges":
+        first, second, lengths, areas = adjacency_measures(geometries, n_jobs=n_jobs)
     else:
-        index, geoms = [[], []]
+        first, second, geoms = adjacency_pairs(geometries, n_jobs=n_jobs)
+        lengths, areas = shapely.length(geoms), shapely.area(geoms)
+
+    if adjacency_type == "rook":
+        rook = lengths > 0
+        first, second, lengths, areas = (
+            array[rook] for array in (first, second, lengths, areas)
+        )
+        if output_type != "edges":
+            geoms = geoms[rook]
+
+    labels = geometries.index.to_flat_index()
+    index = pandas.MultiIndex.from_arrays([labels[first], labels[second]])
 
-    if output_type == "geodataframe":
+    if output_type == "edges":
+        inters = pandas.Series(lengths, index=index, name="length")
+    elif output_type == "geodataframe":
         inters = GeoDataFrame(
-            {"neighbors": index, "geometry": geoms}, crs=geometries.crs
+            {"neighbors": index.to_flat_index(), "geometry": geoms},
+            crs=geometries.crs,
         )
     else:
         inters = GeoSeries(geoms, index=index, crs=geometries.crs)
 
-    if adjacency_type == "rook":
-        inters = inters[inters.length > 0]
-
     if warn_for_overlaps:
-        overlaps = inters[inters.area > 0]
+        overlaps = inters[areas > 0]
         if len(overlaps) > 0:
             warnings.warn(
                 "Found overlapping polygons while computing adjacencies.\n"
@@ -79,19 +282,16 @@ def adjacencies(
             )
 
     if warn_for_islands:
-        if output_type == "geodataframe":
-            islands = set(geometries.index) - set(
-                i for pair in inters["neighbors"] for i in pair
-            )
-        else:
-            islands = set(geometries.index) - set(
-                i for pair in inters.index for i in pair
-            )
+        has_neighbor = numpy.zeros(len(geometries), dtype="bool")
+        has_neighbor[first] = True
+        has_neighbor[second] = True
+        islands = set(geometries.index[~has_neighbor])
         if len(islands) > 0:
             warnings.warn(
                 "Found islands.\n" "Indices of islands: {}".format(islands),
                 IslandWarning,
             )
 
-    inters.crs = orig_crs
+    if output_type != "edges":
+        inters.crs = orig_crs
     return inters
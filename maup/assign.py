@@ -11,18 +11,24 @@ class AssigmentWarning(UserWarning):
 
 
 @require_same_crs
-def assign(sources, targets):
+def assign(sources, targets, n_jobs=None):
     """Assign source geometries to targets. A source is assigned to the
     target that covers it, or, if no target covers the entire source, the
     target that covers the most of its area.
+
+    :param n_jobs: (optional) the number of processes to use for the spatial
+        queries and intersections (see :func:`~maup.intersections`)
+    :type n_jobs: int or None
     """
-    assignment = pandas.Series(assign_by_covering(sources, targets), dtype="float")
+    assignment = pandas.Series(
+        assign_by_covering(sources, targets, n_jobs=n_jobs), dtype="float"
+    )
     assignment.name = None
     unassigned = sources[assignment.isna()]
 
     if len(unassigned):  # skip if done
         assignments_by_area = pandas.Series(
-            assign_by_area(unassigned, targets), dtype="float"
+            assign_by_area(unassigned, targets, n_jobs=n_jobs), dtype="float"
         )
         assignment.update(assignments_by_area)
 
@@ -37,13 +43,15 @@ def assign(sources, targets):
     return assignment.astype(targets.index.dtype, errors="ignore")
 
 
-def assign_by_covering(sources, targets):
+def assign_by_covering(sources, targets, n_jobs=None):
     indexed_sources = IndexedGeometries(sources)
-    return indexed_sources.assign(targets)
+    return indexed_sources.assign(targets, n_jobs=n_jobs)
 
 
-def assign_by_area(sources, targets):
-    return assign_to_max(intersections(sources, targets, area_cutoff=0).area)
+def assign_by_area(sources, targets, n_jobs=None):
+    return assign_to_max(
+        intersections(sources, targets, area_cutoff=0, n_jobs=n_jobs).area
+    )
 
 
 def assign_to_max(weights):
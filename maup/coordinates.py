@@ -0,0 +1,72 @@
+"""Helpers that work directly on the coordinate arrays of geometries."""
+
+import numpy
+import shapely
+
+
+def round_to_grid(values, n=-7):
+    """
+    Rounds an array of floats to the nearest 10^n, with exactly the same results
+    as round(x, -n) (which rounds the exact decimal value of x, with ties going to
+    even). The values are rounded by scaling with NumPy; the few values whose
+    scaled version is too close to a tie for that to be trustworthy are rounded
+    again with round.
+    """
+    values = numpy.asarray(values, dtype="float")
+    if abs(n) > 22:
+        # 10^n can't be represented exactly, so don't bother scaling.
+        return numpy.array(
+            [round(x, -n) for x in values.ravel().tolist()], dtype="float"
+        ).reshape(values.shape)
+
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        if n <= 0:
+            scaled = values * 10.0 ** (-n)
+            rounded = numpy.rint(scaled) / 10.0 ** (-n)
+        else:
+            scaled = values / 10.0**n
+            rounded = numpy.rint(scaled) * 10.0**n
+
+        # Past 2^52 the scaled values are all integers, but scaling back can be
+        # inexact.
+        distance_to_tie = numpy.abs(numpy.abs(scaled - numpy.rint(scaled)) - 0.5)
+        unsure = numpy.flatnonzero(
+            (distance_to_tie <= 4 * numpy.spacing(numpy.abs(scaled)))
+            | ~(numpy.abs(scaled) < 2.0**52)
+        )
+    # (Using Python floats, since NumPy's round is not correctly rounded.)
+    rounded.flat[unsure] = [round(x, -n) for x in values.flat[unsure].tolist()]
+    return rounded
+
+
+def boundary_segment_endpoints(geometries, snap_magnitude=None):
+    """
+    Breaks the boundaries of the polygons in ``geometries`` (an array of
+    geometries) into their individual line segments, all at once. Returns a tuple
+    ``(owners, starts, ends)``, where ``owners`` holds the position of the geometry
+    each segment came from, and ``starts`` and ``ends`` are arrays of the segments'
+    endpoints, ordered so that the endpoints of two copies of the same segment are
+    always in the same order.
+
+    If ``snap_magnitude`` is given, the coordinates are first rounded to the
+    nearest 10^snap_magnitude with round_to_grid, as snap_to_grid does.
+    """
+    parts, part_owners = shapely.get_parts(
+        numpy.asarray(geometries, dtype="object"), return_index=True
+    )
+    polygons = shapely.get_type_id(parts) == 3
+    rings, ring_parts = shapely.get_rings(parts[polygons], return_index=True)
+    coords, coord_rings = shapely.get_coordinates(rings, return_index=True)
+    if snap_magnitude is not None:
+        coords = round_to_grid(coords, snap_magnitude)
+
+    # Consecutive vertices of the same ring make a segment.
+    same_ring = coord_rings[1:] == coord_rings[:-1]
+    starts, ends = coords[:-1][same_ring], coords[1:][same_ring]
+    owners = part_owners[polygons][ring_parts][coord_rings[:-1][same_ring]]
+
+    swap = (starts[:, 0] > ends[:, 0]) | (
+        (starts[:, 0] == ends[:, 0]) & (starts[:, 1] > ends[:, 1])
+    )
+    starts[swap], ends[swap] = ends[swap], starts[swap].copy()
+    return owners, starts, ends
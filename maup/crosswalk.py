@@ -0,0 +1,190 @@
+import json
+
+import numpy
+import pandas
+from pandas.api.types import is_numeric_dtype
+
+from .assign import assign
+from .intersections import intersections
+from .weight_matrix import WeightMatrix, scale_to_unit_sums
+
+
+class Crosswalk:
+    """A precomputed relationship between a set of source geometries and a set of
+    target geometries, for moving many datasets between the same two sets of units
+    without redoing any geometric work.
+
+    Build one with :meth:`from_intersections` or :meth:`from_assignment`, then use
+    :meth:`prorate` and :meth:`aggregate` as many times as needed. A Crosswalk can
+    be written to disk with :meth:`save` and read back with :meth:`load`.
+
+    The relationship is stored as integer arrays: for each piece (a nonempty
+    intersection of a source and a target), the position of its source, the
+    position of its target and its area; and for each source, the position of the
+    target it is assigned to (``-1`` if it is unassigned).
+    """
+
+    def __init__(
+        self, source_positions, target_positions, areas, assignment, sources, targets
+    ):
+        self.source_positions = numpy.asarray(source_positions, dtype="int64")
+        self.target_positions = numpy.asarray(target_positions, dtype="int64")
+        self.areas = numpy.asarray(areas, dtype="float")
+        self.assignment = numpy.asarray(assignment, dtype="int64")
+        self.sources = pandas.Index(sources)
+        self.targets = pandas.Index(targets)
+
+    @classmethod
+    def from_intersections(cls, sources, targets, area_cutoff=0):
+        """Builds a Crosswalk from the :func:`~maup.intersections` of ``sources``
+        and ``targets``. Each source is assigned to the target that covers the
+        largest part of its area.
+
+        :param area_cutoff: (optional) only keep intersections with area greater
+            than ``area_cutoff``. The default (``0``) drops intersections that are
+            only points or lines.
+        :type area_cutoff: Number or None
+        """
+        areas = intersections(
+            sources, targets, output_type="areas", area_cutoff=area_cutoff
+        )
+        source_positions = sources.index.get_indexer(
+            areas.index.get_level_values("source")
+        )
+        target_positions = targets.index.get_indexer(
+            areas.index.get_level_values("target")
+        )
+        areas = areas.to_numpy(dtype="float")
+
+        # Assign each source to the target of its largest piece: sort the pieces by
+        # source and then by decreasing area, and take the first piece of each source.
+        order = numpy.lexsort((-areas, source_positions))
+        first_of_source = numpy.ones(len(order), dtype="bool")
+        first_of_source[1:] = numpy.diff(source_positions[order]) != 0
+        largest = order[first_of_source]
+        assignment = numpy.full(len(sources), -1, dtype="int64")
+        assignment[source_positions[largest]] = target_positions[largest]
+
+        return cls(
+            source_positions,
+            target_positions,
+            areas,
+            assignment,
+            sources.index,
+            targets.index,
+        )
+
+    @classmethod
+    def from_assignment(cls, sources, targets):
+        """Builds a Crosswalk from :func:`~maup.assign`, so that each source is
+        related only to the one target it is assigned to. Use this when the
+        sources nest (or nearly nest) in the targets, e.g. blocks in precincts.
+        """
+        assignment = targets.index.get_indexer(assign(sources, targets))
+        assigned = assignment >= 0
+        return cls(
+            numpy.flatnonzero(assigned),
+            assignment[assigned],
+            sources.area.to_numpy(dtype="float")[assigned],
+            assignment,
+            sources.index,
+            targets.index,
+        )
+
+    def __len__(self):
+        return len(self.areas)
+
+    @property
+    def pairs(self):
+        """The (source, target) MultiIndex of the pieces in this Crosswalk."""
+        return pandas.MultiIndex.from_arrays(
+            [self.sources[self.source_positions], self.targets[self.target_positions]],
+            names=["source", "target"],
+        )
+
+    def weight_matrix(self, weights=None):
+        """Returns the :class:`~maup.WeightMatrix` used by :meth:`prorate`, with the
+        weights of each source normalized to sum to one."""
+        if weights is None:
+            weights = self.areas
+        else:
+            weights = weights.reindex(self.pairs).to_numpy(dtype="float")
+
+        return WeightMatrix(
+            self.source_positions,
+            self.target_positions,
+            scale_to_unit_sums(weights, self.source_positions, len(self.sources)),
+            self.sources,
+            self.targets,
+        )
+
+    def prorate(self, data, weights=None):
+        """Prorates ``data`` from the sources to the targets. Each source's data is
+        split among its pieces in proportion to ``weights`` and summed up by target.
+
+        :param data: the data to move (indexed the same as the sources)
+        :type data: :class:`pandas.Series` or :class:`pandas.DataFrame`
+        :param weights: (optional) the weight of each piece, as a Series with a
+            (source, target) MultiIndex, e.g. the population of each piece computed
+            from blocks. The weights are normalized for each source. By default the
+            pieces are weighted by area. (Please see the warning in the docs about
+            prorating by area!)
+        :type weights: :class:`pandas.Series` or None
+        :rtype: the same type as ``data``, indexed by the targets
+        """
+        return self.weight_matrix(weights).prorate(data)
+
+    def aggregate(self, data):
+        """Sums ``data`` from the sources up to the target each source is assigned
+        to, like ``data.groupby(assignment).sum()``. Unassigned sources are left
+        out.
+
+        :param data: the data to move (indexed the same as the sources)
+        :type data: :class:`pandas.Series` or :class:`pandas.DataFrame`
+        :rtype: the same type as ``data``, indexed by the targets
+        """
+        assigned = numpy.flatnonzero(self.assignment >= 0)
+        matrix = WeightMatrix(
+            assigned,
+            self.assignment[assigned],
+            numpy.ones(len(assigned)),
+            self.sources,
+            self.targets,
+        )
+        return matrix.prorate(data)
+
+    def save(self, path):
+        """Saves the Crosswalk to ``path`` as a NumPy ``.npz`` file.
+
+        Source and target labels that are not numeric are saved as strings.
+        """
+        numpy.savez_compressed(
+            path,
+            source_positions=self.source_positions,
+            target_positions=self.target_positions,
+            areas=self.areas,
+            assignment=self.assignment,
+            sources=_labels_to_array(self.sources),
+            targets=_labels_to_array(self.targets),
+            names=json.dumps([self.sources.name, self.targets.name]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Loads a Crosswalk that was saved with :meth:`save`."""
+        with numpy.load(path, allow_pickle=False) as saved:
+            source_name, target_name = json.loads(str(saved["names"]))
+            return cls(
+                saved["source_positions"],
+                saved["target_positions"],
+                saved["areas"],
+                saved["assignment"],
+                pandas.Index(saved["sources"], name=source_name),
+                pandas.Index(saved["targets"], name=target_name),
+            )
+
+
+def _labels_to_array(labels):
+    if is_numeric_dtype(labels.dtype):
+        return labels.to_numpy()
+    return labels.astype(str).to_numpy(dtype="str")
@@ -4,7 +4,13 @@ import numpy
 
 from shapely.prepared import prep
 from shapely.strtree import STRtree
-from .progress_bar import progress
+from .parallel import (
+    effective_n_jobs,
+    intersections_kernel,
+    map_chunks,
+    measures_kernel,
+    pairs_kernel,
+)
 
 
 def get_geometries(geometries):
@@ -43,37 +49,111 @@ class IndexedGeometries:
             selected_geometries = relevant_geometries.apply(prepared_container.covers)
             return relevant_geometries[selected_geometries]
 
-    def assign(self, targets):
+    def assign(self, targets, n_jobs=None):
         target_geometries = get_geometries(targets)
-        groups = [
-            self.covered_by(container).apply(lambda x: container_index)
-            for container_index, container in progress(
-                target_geometries.items(), len(target_geometries)
-            )
-        ]
-        # New in pandas 2.1.2: Only concatenate Series of positive length
-        groups = [group for group in groups if len(group) > 0]
-        if groups:
-            groups_concat = pandas.concat(groups)
-            # New in pandas 2.1.2: No reindexing allowed with a non-unique Index,
-            # so we need to find and remove repetitions.  (This only happens when the
-            # targets have overlaps and some source is completely covered by more
-            # than one target.)
-            # Any that get removed here will be randomly assigned to one of the
-            # covering units at the assign_by_area step ub maup.assign.
-            groups_concat_index_list = list(groups_concat.index)
-            seen = set()
-            bad_indices = list(
-                set([x for x in groups_concat_index_list if x in seen or seen.add(x)])
-            )
-            if len(bad_indices) > 0:
-                groups_concat = groups_concat.drop(bad_indices)
-            return groups_concat.reindex(self.index)
-        else:
+        # Find every (target, source) pair where the target covers the source with
+        # a single query against the spatial index.
+        target_positions, source_positions = self.query_pairs(
+            target_geometries, predicate="covers", n_jobs=n_jobs
+        )
+        if len(source_positions) == 0:
             return geopandas.GeoSeries().reindex(self.index)
 
-    def enumerate_intersections(self, targets):
+        # When the targets have overlaps, some sources may be completely covered by
+        # more than one target. Those sources are dropped here; they get randomly
+        # assigned to one of the covering units at the assign_by_area step in
+        # maup.assign.
+        _, inverse, counts = numpy.unique(
+            source_positions, return_inverse=True, return_counts=True
+        )
+        covered_once = counts[inverse] == 1
+
+        target_labels = target_geometries.index[target_positions[covered_once]]
+        if isinstance(target_labels, pandas.MultiIndex):
+            target_labels = target_labels.to_flat_index()
+
+        assignment = pandas.Series(
+            target_labels,
+            index=self.index[source_positions[covered_once]],
+            name=self.geometries.name,
+        )
+        return assignment.reindex(self.index)
+
+    def query_pairs(self, targets, predicate="intersects", n_jobs=None):
+        """Queries the spatial index with every target at once. Returns a pair of
+        integer arrays ``(target_positions, source_positions)`` giving the positions
+        of each (target, source) pair that satisfies ``predicate``.
+        """
+        target_positions, source_positions, _ = self.map_kernel(
+            pairs_kernel, targets, n_jobs, predicate=predicate
+        )
+        return target_positions, source_positions
+
+    def intersection_pairs(self, targets, n_jobs=None, ranks=None):
+        """Computes all of the nonempty intersections between the indexed
+        geometries and the targets. Returns a tuple ``(target_positions,
+        source_positions, geometries)`` of arrays, one entry per intersection.
+
+        :param ranks: (optional) only for when the targets are the indexed
+            geometries themselves: keep just the pairs where the target's rank is
+            less than the source's, so that each pair is only computed once.
+        """
+        return self.map_kernel(intersections_kernel, targets, n_jobs, ranks=ranks)
+
+    def enumerate_intersections(self, targets, n_jobs=None):
         target_geometries = get_geometries(targets)
-        for i, target in progress(target_geometries.items(), len(target_geometries)):
-            for j, intersection in self.intersections(target).items():
-                yield i, j, intersection
+        target_positions, source_positions, geometries = self.intersection_pairs(
+            target_geometries, n_jobs=n_jobs
+        )
+        target_labels = target_geometries.index[target_positions]
+        source_labels = self.index[source_positions]
+        yield from zip(target_labels, source_labels, geometries)
+
+    def intersection_areas(self, targets, batch_size=100_000, n_jobs=None):
+        """Computes the areas of all the nonempty intersections between the indexed
+        geometries and the targets, without keeping the intersection geometries
+        around. Returns a tuple ``(target_positions, source_positions, areas)`` of
+        arrays, one entry per nonempty intersection.
+
+        The intersections are computed ``batch_size`` pairs at a time and discarded
+        as soon as their areas are known, so peak memory stays flat.
+        """
+        target_positions, source_positions, values = self.intersection_measures(
+            targets, ("area",), batch_size=batch_size, n_jobs=n_jobs
+        )
+        return target_positions, source_positions, values[:, 0]
+
+    def intersection_measures(
+        self, targets, measures, batch_size=100_000, n_jobs=None, ranks=None
+    ):
+        """Like :meth:`intersection_areas`, but measures each intersection with
+        every shapely function named in ``measures`` (e.g. ``("length", "area")``).
+        The values are returned as an array with one column per measure.
+        ``ranks`` works as in :meth:`intersection_pairs`.
+        """
+        return self.map_kernel(
+            measures_kernel,
+            targets,
+            n_jobs,
+            measures=tuple(measures),
+            batch_size=batch_size,
+            ranks=ranks,
+        )
+
+    def map_kernel(self, kernel, targets, n_jobs=None, **options):
+        """Runs one of the kernels from :mod:`maup.parallel` against the targets,
+        either here or, if ``n_jobs`` asks for more than one process, over
+        spatially coherent chunks of the targets in a pool of worker processes.
+        The results are the same either way.
+        """
+        source_array = numpy.asarray(self.geometries.values)
+        target_array = numpy.asarray(get_geometries(targets).values)
+        if effective_n_jobs(n_jobs) == 1:
+            return kernel(
+                self.spatial_index,
+                source_array,
+                target_array,
+                numpy.arange(len(target_array)),
+                **options,
+            )
+        return map_chunks(kernel, source_array, target_array, n_jobs, **options)
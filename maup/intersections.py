@@ -4,10 +4,13 @@ from geopandas import GeoDataFrame
 from .crs import require_same_crs
 from .indexed_geometries import IndexedGeometries
 from .indices import get_geometries_with_range_index
+from .weight_matrix import WeightMatrix, can_prorate_with_matrix
 
 
 @require_same_crs
-def intersections(sources, targets, output_type="geoseries", area_cutoff=None):
+def intersections(
+    sources, targets, output_type="geoseries", area_cutoff=None, n_jobs=None
+):
     """Computes all of the nonempty intersections between two sets of geometries.
     By default, the returned `~geopandas.GeoSeries` will have a MultiIndex, where the
     geometry at index *(i, j)* is the intersection of ``sources[i]`` and ``targets[j]``
@@ -15,6 +18,11 @@ def intersections(sources, targets, output_type="geoseries", area_cutoff=None):
     If output_type == "geodataframe", the return type is a range-indexed GeoDataFrame
     with "source" and "target" columns containing the indices i,j, respectively, for the
     intersection of ``sources[i]`` and ``targets[j]``
+    If output_type == "areas", the return type is a `~pandas.Series` of floats with the
+    same MultiIndex, whose entry at *(i, j)* is the area of the intersection. The
+    intersection geometries themselves are never kept in memory, which makes this the
+    cheapest option when the intersections are only used for weights (e.g. with
+    :func:`~maup.normalize` and :func:`~maup.prorate`).
     :param sources: geometries
     :type sources: :class:`~geopandas.GeoSeries` or :class:`~geopandas.GeoDataFrame`
     :param targets: geometries
@@ -23,17 +31,40 @@ def intersections(sources, targets, output_type="geoseries", area_cutoff=None):
     :param area_cutoff: (optional) if provided, only return intersections with
         area greater than ``area_cutoff``
     :type area_cutoff: Number or None
+    :param n_jobs: (optional) the number of processes to compute the intersections
+        with. The targets are split into chunks of nearby geometries that are
+        handled in parallel, and the result is the same as with a single process.
+        ``None`` (the default) and ``1`` use just the current process, and ``-1``
+        uses all of the CPUs.
+    :type n_jobs: int or None
     """
 
     reindexed_sources = get_geometries_with_range_index(sources)
     reindexed_targets = get_geometries_with_range_index(targets)
     spatially_indexed_sources = IndexedGeometries(reindexed_sources)
 
+    if output_type == "areas":
+        target_positions, source_positions, areas = (
+            spatially_indexed_sources.intersection_areas(
+                reindexed_targets, n_jobs=n_jobs
+            )
+        )
+        index = pandas.MultiIndex.from_arrays(
+            [sources.index[source_positions], targets.index[target_positions]],
+            names=["source", "target"],
+        )
+        areas = pandas.Series(areas, index=index).sort_index()
+
+        if area_cutoff is not None:
+            areas = areas[areas > area_cutoff]
+
+        return areas
+
     records = [
         # Flip i, j to j, i so that the index is ["source", "target"]
         (sources.index[j], targets.index[i], geometry)
         for i, j, geometry in spatially_indexed_sources.enumerate_intersections(
-            reindexed_targets
+            reindexed_targets, n_jobs=n_jobs
         )
     ]
 
@@ -69,7 +100,20 @@ def prorate(relationship, data, weights, aggregate_by="sum"):
     :type weights: :class:`pandas.Series`
     :param function aggregate_by: (optional) the function to use for aggregating from
         ``inters`` to ``targets``. The default is ``"sum"``.
+
+    When ``relationship`` is MultiIndexed, the data is numeric and ``aggregate_by`` is
+    ``"sum"``, the proration is done as a single sparse matrix product over all of
+    the columns of ``data`` (see :class:`~maup.WeightMatrix`).
     """
+    if (
+        relationship.index.nlevels > 1
+        and isinstance(aggregate_by, str)
+        and aggregate_by == "sum"
+        and can_prorate_with_matrix(data)
+    ):
+        weights = weights.reindex_like(relationship)
+        return WeightMatrix.from_series(weights).prorate(data)
+
     if relationship.index.nlevels > 1:
         source_assignment = relationship.index.get_level_values("source").to_series(
             index=relationship.index
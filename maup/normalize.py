@@ -1,11 +1,18 @@
+import numpy
+import pandas
 from pandas import Series
 
+from .weight_matrix import scale_to_unit_sums
+
 
 def normalize(weights, level=0):
     """Takes a series of MultiIndexed weights and normalizes them with
     respect to one level (level 0 by default)."""
-    source_assignment = Series(
-        weights.index.get_level_values(level), index=weights.index
+    positions, labels = pandas.factorize(weights.index.get_level_values(level))
+    has_label = positions >= 0
+
+    normalized = numpy.zeros(len(weights))
+    normalized[has_label] = scale_to_unit_sums(
+        weights.to_numpy(dtype="float")[has_label], positions[has_label], len(labels)
     )
-    denominators = source_assignment.map(weights.groupby(source_assignment).sum())
-    return (weights / denominators).fillna(0)
+    return Series(normalized, index=weights.index)
@@ -0,0 +1,208 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy
+import shapely
+from geopandas import GeoSeries
+from shapely.strtree import STRtree
+
+from .progress_bar import progress
+
+# Number of chunks of targets handed to each worker process. Using a few chunks per
+# worker keeps every worker busy when some chunks are much slower than others.
+CHUNKS_PER_JOB = 4
+
+
+def effective_n_jobs(n_jobs):
+    """Returns the number of worker processes to use for ``n_jobs``. ``None`` and
+    ``1`` mean that everything runs in the current process, and negative values
+    count back from the number of CPUs (``-1`` uses all of them).
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs == 0:
+        raise ValueError("n_jobs must be a nonzero integer or None")
+    if n_jobs < 0:
+        return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def spatial_chunks(geometries, n_chunks):
+    """Splits the positions of ``geometries`` into at most ``n_chunks`` groups of
+    about the same size, such that the geometries in each group are close to each
+    other. The geometries are ordered along a Hilbert curve through the centers of
+    their bounding boxes, and the curve is cut into ``n_chunks`` pieces.
+    """
+    geometries = numpy.asarray(geometries)
+    if len(geometries) == 0:
+        return []
+
+    bounds = shapely.bounds(geometries)
+    x = (bounds[:, 0] + bounds[:, 2]) / 2
+    y = (bounds[:, 1] + bounds[:, 3]) / 2
+    # Empty and missing geometries have no bounds; put them all at one corner.
+    missing = numpy.isnan(x) | numpy.isnan(y)
+    if missing.all():
+        x[:], y[:] = 0, 0
+    else:
+        x[missing], y[missing] = numpy.nanmin(x), numpy.nanmin(y)
+
+    distances = GeoSeries(shapely.points(x, y)).hilbert_distance()
+    order = numpy.argsort(distances.to_numpy(), kind="stable")
+    return [chunk for chunk in numpy.array_split(order, n_chunks) if len(chunk)]
+
+
+def query_kernel(tree, sources, targets, target_positions, *, predicate, ranks=None):
+    """Finds the (target, source) pairs satisfying ``predicate``. If ``ranks`` is
+    given, the targets must be the same geometries as the sources and only the
+    pairs where the target ranks strictly below the source are kept.
+    """
+    local_positions, source_positions = tree.query(targets, predicate=predicate)
+    if ranks is not None:
+        keep = ranks[target_positions[local_positions]] < ranks[source_positions]
+        local_positions = local_positions[keep]
+        source_positions = source_positions[keep]
+    return local_positions, source_positions
+
+
+def pairs_kernel(tree, sources, targets, target_positions, *, predicate, ranks=None):
+    local_positions, source_positions = query_kernel(
+        tree, sources, targets, target_positions, predicate=predicate, ranks=ranks
+    )
+    return target_positions[local_positions], source_positions, None
+
+
+def intersections_kernel(
+    tree, sources, targets, target_positions, *, batch_size=100_000, ranks=None
+):
+    """Computes the intersections of the (target, source) pairs ``batch_size`` at
+    a time, so that the progress bar follows the intersections as they are
+    computed.
+    """
+    local_positions, source_positions = query_kernel(
+        tree, sources, targets, target_positions, predicate="intersects", ranks=ranks
+    )
+    geometries = numpy.empty(len(local_positions), dtype="object")
+
+    batches = range(0, len(local_positions), batch_size)
+    for start in progress(batches, len(batches)):
+        batch = slice(start, start + batch_size)
+        geometries[batch] = shapely.intersection(
+            sources[source_positions[batch]], targets[local_positions[batch]]
+        )
+
+    nonempty = ~(shapely.is_empty(geometries) | shapely.is_missing(geometries))
+    return (
+        target_positions[local_positions[nonempty]],
+        source_positions[nonempty],
+        geometries[nonempty],
+    )
+
+
+def measures_kernel(
+    tree, sources, targets, target_positions, *, measures, batch_size, ranks=None
+):
+    """Computes the intersections of the (target, source) pairs ``batch_size`` at
+    a time and measures each one with the shapely functions named in
+    ``measures`` (e.g. ``("area",)``). The intersections are discarded as soon as
+    they are measured, so peak memory stays flat. The values are returned as an
+    array with one column per measure.
+    """
+    local_positions, source_positions = query_kernel(
+        tree, sources, targets, target_positions, predicate="intersects", ranks=ranks
+    )
+    values = numpy.empty((len(local_positions), len(measures)), dtype="float")
+    nonempty = numpy.empty(len(local_positions), dtype="bool")
+
+    batches = range(0, len(local_positions), batch_size)
+    for start in progress(batches, len(batches)):
+        batch = slice(start, start + batch_size)
+        geometries = shapely.intersection(
+            sources[source_positions[batch]], targets[local_positions[batch]]
+        )
+        nonempty[batch] = ~(
+            shapely.is_empty(geometries) | shapely.is_missing(geometries)
+        )
+        for column, measure in enumerate(measures):
+            values[batch, column] = getattr(shapely, measure)(geometries)
+
+    return (
+        target_positions[local_positions[nonempty]],
+        source_positions[nonempty],
+        values[nonempty],
+    )
+
+
+def map_chunks(kernel, sources, targets, n_jobs, **options):
+    """Runs ``kernel`` over spatially coherent chunks of ``targets`` in a pool of
+    ``n_jobs`` worker processes, and merges the results into exactly what
+    ``kernel`` returns when it is run on all of the targets at once.
+
+    The sources (and ``options``) are sent to each worker just once, as WKB, and
+    every worker builds its own spatial index of the sources.
+    """
+    n_jobs = effective_n_jobs(n_jobs)
+    chunks = spatial_chunks(targets, n_jobs * CHUNKS_PER_JOB)
+    if not chunks:
+        return kernel(STRtree(sources), sources, targets, numpy.arange(0), **options)
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_initialize_worker,
+        initargs=(shapely.to_wkb(sources), options),
+    ) as executor:
+        futures = [
+            executor.submit(_run_kernel, kernel, shapely.to_wkb(targets[chunk]), chunk)
+            for chunk in chunks
+        ]
+        for future in progress(as_completed(futures), len(futures)):
+            results.append(future.result())
+
+    target_positions = numpy.concatenate([result[0] for result in results])
+    source_positions = numpy.concatenate([result[1] for result in results])
+    if results[0][2] is None:
+        values = None
+    else:
+        values = numpy.concatenate([_from_wire(result[2]) for result in results])
+
+    # Each target belongs to exactly one chunk, so a stable sort by target position
+    # restores the order of a single run over all of the targets.
+    order = numpy.argsort(target_positions, kind="stable")
+    return (
+        target_positions[order],
+        source_positions[order],
+        None if values is None else values[order],
+    )
+
+
+_worker_state = {}
+
+
+def _initialize_worker(source_wkb, options):
+    progress.enabled = False
+    sources = shapely.from_wkb(source_wkb)
+    _worker_state.update(tree=STRtree(sources), sources=sources, options=options)
+
+
+def _run_kernel(kernel, target_wkb, target_positions):
+    target_positions, source_positions, values = kernel(
+        _worker_state["tree"],
+        _worker_state["sources"],
+        shapely.from_wkb(target_wkb),
+        target_positions,
+        **_worker_state["options"],
+    )
+    return target_positions, source_positions, _to_wire(values)
+
+
+def _to_wire(values):
+    if values is not None and values.dtype == object:
+        return ("wkb", shapely.to_wkb(values))
+    return values
+
+
+def _from_wire(values):
+    if isinstance(values, tuple):
+        return shapely.from_wkb(values[1])
+    return values
@@ -1,24 +1,24 @@
-import functools
 import warnings
 
-import pandas
+import numpy
+import shapely
 
 from geopandas import GeoSeries
 from shapely.geometry import (
     Polygon,
     MultiPolygon,
-    LineString,
-    MultiLineString,
     GeometryCollection,
 )
 from shapely import union_all
+from shapely.strtree import STRtree
 
 from .adjacencies import adjacencies
 from .assign import assign_to_max
+from .coordinates import round_to_grid
 from .crs import require_same_crs
 from .indexed_geometries import get_geometries
 from .intersections import intersections
-
+from .parallel import spatial_chunks
 
 """
 Some of these functions are based on the functions in Mary Barker's
@@ -71,37 +71,104 @@ def trim_valid(value):
     return value
 
 
-def holes_of_union(geometries):
-    """Returns any holes in the union of the given geometries."""
+def holes_of_union(geometries, chunk_size=None, drop_covered=False):
+    """Returns any holes in the union of the given geometries.
+
+    If `chunk_size` is given, the union is computed hierarchically: the geometries
+    are unioned in spatially compact chunks of at most `chunk_size` geometries, then
+    the unions of the chunks are unioned in the same way, and so on. This bounds the
+    peak memory use for very large inputs, such as all of the blocks in a state.
+
+    When the geometries overlap, a union can leave a sliver inside of one of them
+    where it rounds the points at which their edges cross, and where that happens
+    depends on how the union is split up. So with overlapping geometries, the
+    chunked union can find a few more or fewer of these slivers than the plain
+    union. Pass `drop_covered=True` to leave out every hole that is mostly covered
+    by the geometries; then both give the same holes. This costs a spatial query
+    and an intersection for every hole, so it is off by default.
+    """
     geometries = get_geometries(geometries)
-    if not all(
-        isinstance(geometry, (Polygon, MultiPolygon)) for geometry in geometries
-    ):
+    type_ids = shapely.get_type_id(numpy.asarray(geometries.values))
+    if not numpy.isin(type_ids, (3, 6)).all():
         raise TypeError(
-            f"Must be a Polygon or MultiPolygon (got types {set([x.geom_type for x in geometries])})!"
+            f"Must be a Polygon or MultiPolygon (got types {set(geometries.geom_type)})!"
         )
 
-    union = union_all(geometries)
+    union = union_of(geometries, chunk_size=chunk_size)
     series = holes(union)
+    if drop_covered:
+        series = drop_covered_holes(series, geometries)
     series.crs = geometries.crs
     return series
 
 
+def drop_covered_holes(candidates, geometries):
+    """Drops the holes that are mostly covered by the geometries."""
+    candidate_values = numpy.asarray(candidates.values)
+    values = numpy.asarray(geometries.values)
+    hole_positions, geometry_positions = STRtree(values).query(candidate_values)
+    covered = numpy.bincount(
+        hole_positions,
+        weights=shapely.area(
+            shapely.intersection(
+                candidate_values[hole_positions], values[geometry_positions]
+            )
+        ),
+        minlength=len(candidate_values),
+    )
+    keep = covered <= 0.5 * shapely.area(candidate_values)
+    return GeoSeries(candidate_values[keep])
+
+
 def holes(geometry):
     """Returns any holes in a Polygon or MultiPolygon."""
-    if isinstance(geometry, MultiPolygon):
-        return GeoSeries(
-            [
-                Polygon(list(hole.coords))
-                for polygon in geometry.geoms
-                for hole in polygon.interiors
-            ]
-        )
-    elif isinstance(geometry, Polygon):
-        return GeoSeries([Polygon(list(hole.coords)) for hole in geometry.interiors])
-    else:
+    if not isinstance(geometry, (Polygon, MultiPolygon)):
         raise TypeError("geometry must be a Polygon or MultiPolygon to have holes")
 
+    polygons = shapely.get_parts(geometry)
+    num_holes = shapely.get_num_interior_rings(polygons)
+    first_holes = numpy.repeat(num_holes.cumsum() - num_holes, num_holes)
+    rings = shapely.get_interior_ring(
+        numpy.repeat(polygons, num_holes), numpy.arange(num_holes.sum()) - first_holes
+    )
+    return GeoSeries(shapely.polygons(rings))
+
+
+def union_of(geometries, chunk_size=None):
+    """
+    Returns the union of the geometries, using the faster coverage union when the
+    geometries do not overlap. If `chunk_size` is given, the geometries are unioned
+    in spatially compact chunks of at most that many geometries, repeatedly, until
+    only one geometry is left.
+    """
+    values = numpy.asarray(get_geometries(geometries).values)
+    if chunk_size is not None:
+        if chunk_size < 2:
+            raise ValueError("chunk_size must be at least 2")
+        while len(values) > chunk_size:
+            chunks = spatial_chunks(values, -(-len(values) // chunk_size))
+            values = numpy.array(
+                [coverage_union(values[chunk]) for chunk in chunks], dtype="object"
+            )
+    if len(values) == 1:
+        return union_all(values)
+    return coverage_union(values)
+
+
+def coverage_union(pieces):
+    """
+    Union pieces that are known not to overlap (up to their boundaries), using the
+    much faster coverage union when the result checks out and a full union otherwise.
+    """
+    try:
+        union = shapely.coverage_union_all(pieces)
+    except shapely.errors.GEOSException:
+        return union_all(pieces)
+    total_area = shapely.area(pieces).sum()
+    if shapely.is_valid(union) and abs(union.area - total_area) <= 1e-9 * total_area:
+        return union
+    return union_all(pieces)
+
 
 def close_gaps(geometries, relative_threshold=0.1, force_polygons=False):
     """Closes gaps between geometries by assigning the hole to the polygon
@@ -160,12 +227,7 @@ def resolve_overlaps(geometries, relative_threshold=0.1, force_polygons=False):
     if len(overlaps) == 0:
         return geometries
 
-    to_remove = GeoSeries(
-        pandas.concat([overlaps.droplevel(1), overlaps.droplevel(0)]), crs=overlaps.crs
-    )
-    with_overlaps_removed = geometries.apply(
-        lambda x: x.difference(union_all(to_remove))
-    )
+    with_overlaps_removed = remove_overlaps(geometries, overlaps)
 
     return absorb_by_shared_perimeter(
         overlaps,
@@ -175,6 +237,33 @@ def resolve_overlaps(geometries, relative_threshold=0.1, force_polygons=False):
     )
 
 
+def remove_overlaps(geometries, overlaps):
+    """
+    Removes the overlaps from the geometries. Each geometry is differenced only
+    against the union of the overlaps that intersect it (found with a spatial
+    index), and all of the differences are computed in one vectorized call.
+    """
+    values = numpy.asarray(geometries.values)
+    overlap_values = numpy.asarray(overlaps.values)
+    positions, overlap_positions = STRtree(overlap_values).query(
+        values, predicate="intersects"
+    )
+
+    order = numpy.argsort(positions, kind="stable")
+    positions, starts = numpy.unique(positions[order], return_index=True)
+    groups = numpy.split(overlap_values[overlap_positions[order]], starts[1:])
+    to_remove = numpy.array(
+        [group[0] if len(group) == 1 else union_all(group) for group in groups],
+        dtype="object",
+    )
+
+    values = values.copy()
+    values[positions] = shapely.difference(values[positions], to_remove)
+    return GeoSeries(
+        values, index=geometries.index, crs=geometries.crs, name=geometries.name
+    )
+
+
 def quick_repair(geometries, relative_threshold=0.1, force_polygons=False):
     """
     New name for autorepair function from Maup 1.x.
@@ -243,9 +332,19 @@ def remove_repeated_vertices(geometries):
     """
     Removes repeated vertices. Vertices are considered to be repeated if they
     appear consecutively, excluding the start and end points.
+
+    All of the polygonal rows are deduplicated in one pass; any other rows are
+    returned unchanged. The result is a GeoSeries with the same index and CRS as
+    the input.
     """
-    return geometries.geometry.apply(
-        lambda x: apply_func_to_polygon_parts(x, dedup_vertices)
+    geometries = get_geometries(geometries)
+    values = numpy.asarray(geometries.values)
+    polygonal = numpy.isin(shapely.get_type_id(values), (3, 6))
+
+    deduped = values.copy()
+    deduped[polygonal] = shapely.remove_repeated_points(values[polygonal])
+    return GeoSeries(
+        deduped, index=geometries.index, crs=geometries.crs, name=geometries.name
     )
 
 
@@ -253,9 +352,25 @@ def snap_to_grid(geometries, n=-7):
     """
     Snap the geometries to a grid by rounding to the nearest 10^n. Helps to
     resolve floating point precision issues in shapefiles.
+
+    All of the coordinates are rounded at once, and the result is a GeoSeries with
+    the same index and CRS as the input.
     """
-    func = functools.partial(snap_polygon_to_grid, n=n)
-    return geometries.geometry.apply(lambda x: apply_func_to_polygon_parts(x, func))
+    geometries = get_geometries(geometries)
+    values = numpy.asarray(geometries.values)
+    not_polygonal = ~numpy.isin(shapely.get_type_id(values), (3, 6))
+    if not_polygonal.any():
+        shape = values[not_polygonal][0]
+        raise TypeError(
+            f"Can only snap a Polygon or MultiPolygon to a grid (got {shape} with type {type(shape)})!"
+        )
+
+    return GeoSeries(
+        snap_coordinates_to_grid(values, n),
+        index=geometries.index,
+        crs=geometries.crs,
+        name=geometries.name,
+    )
 
 
 @require_same_crs
@@ -308,7 +423,7 @@ def expand_to(source, target, force_polygons=False):
     return geometries
 
 
-def doctor(source, target=None, silent=False, accept_holes=False):
+def doctor(source, target=None, silent=False, accept_holes=False, chunk_size=None):
     """
     Detects quality issues in a given set of source and target geometries. Quality
     issues include overlaps, gaps, invalid geometries, non-perfect
@@ -320,16 +435,19 @@ def doctor(source, target=None, silent=False, accept_holes=False):
 
     If accept_holes is True, then holes alone do not cause doctor to return a value of
     False. (Default is accept_holes = False.)
+
+    If chunk_size is given, unions are computed hierarchically in chunks of at most
+    chunk_size geometries to bound memory use (see `holes_of_union`).
     """
     shapefiles = [source]
-    source_union = union_all(get_geometries(source))
 
     health_check = True
 
     if target is not None:
         shapefiles.append(target)
 
-        target_union = union_all(get_geometries(target))
+        source_union = union_of(source, chunk_size=chunk_size)
+        target_union = union_of(target, chunk_size=chunk_size)
         sym_area = target_union.symmetric_difference(source_union).area
 
         if sym_area != 0:
@@ -346,7 +464,7 @@ def doctor(source, target=None, silent=False, accept_holes=False):
             health_check = False
 
         overlaps = count_overlaps(shp)
-        num_holes = len(holes_of_union(shp))
+        num_holes = len(holes_of_union(shp, chunk_size=chunk_size))
 
         if overlaps != 0:
             if silent is False:
@@ -375,11 +493,11 @@ def count_overlaps(shp):
     return len(overlaps)
 
 
-def count_holes(shp):
+def count_holes(shp, chunk_size=None):
     """
     Counts gaps between geometries.
     """
-    gaps = holes_of_union(shp.geometry)
+    gaps = holes_of_union(shp.geometry, chunk_size=chunk_size)
     return len(gaps)
 
 
@@ -395,62 +513,24 @@ def apply_func_to_polygon_parts(shape, func):
 
 
 def dedup_vertices(polygon):
-    if len(polygon.interiors) == 0:
-        deduped_vertices = []
-        for c, p in enumerate(list(polygon.exterior.coords)):
-            if c == 0:
-                deduped_vertices.append(p)
-            elif p != deduped_vertices[-1]:
-                deduped_vertices.append(p)
-        return Polygon(deduped_vertices)
-
-    else:
-        deduped_vertices_exterior = []
-        for c, p in enumerate(list(polygon.exterior.coords)):
-            if c == 0:
-                deduped_vertices_exterior.append(p)
-            elif p != deduped_vertices_exterior[-1]:
-                deduped_vertices_exterior.append(p)
-
-        deduped_vertices_interiors = []
-        for interior_ring in polygon.interiors:
-            deduped_vertices_this_ring = []
-            for c, p in enumerate(list(interior_ring.coords)):
-                if c == 0:
-                    deduped_vertices_this_ring.append(p)
-                elif p != deduped_vertices_this_ring[-1]:
-                    deduped_vertices_this_ring.append(p)
-            deduped_vertices_interiors.append(deduped_vertices_this_ring)
-        return Polygon(deduped_vertices_exterior, holes=deduped_vertices_interiors)
+    return shapely.remove_repeated_points(polygon)
 
 
 def snap_polygon_to_grid(polygon, n=-7):
-    if len(polygon.interiors) == 0:
-        return Polygon(
-            [(round(x, -n), round(y, -n)) for x, y in polygon.exterior.coords]
-        )
-    else:
-        return Polygon(
-            [(round(x, -n), round(y, -n)) for x, y in polygon.exterior.coords],
-            holes=[
-                [(round(x, -n), round(y, -n)) for x, y in interior_ring.coords]
-                for interior_ring in polygon.interiors
-            ],
-        )
+    return snap_coordinates_to_grid(polygon, n)
 
 
 def snap_multilinestring_to_grid(multilinestring, n=-7):
-    if multilinestring.geom_type == "LineString":
-        return LineString(
-            [(round(x, -n), round(y, -n)) for x, y in multilinestring.coords]
-        )
-    elif multilinestring.geom_type == "MultiLineString":
-        return MultiLineString(
-            [
-                LineString([(round(x, -n), round(y, -n)) for x, y in linestring.coords])
-                for linestring in multilinestring.geoms
-            ]
-        )
+    if multilinestring.geom_type in ("LineString", "MultiLineString"):
+        return snap_coordinates_to_grid(multilinestring, n)
+
+
+def snap_coordinates_to_grid(geometries, n=-7):
+    """
+    Rounds every x and y coordinate of the geometries (a geometry or an array of
+    them) to the nearest 10^n, in one pass over the packed coordinate array.
+    """
+    return shapely.transform(geometries, lambda coords: round_to_grid(coords, n))
 
 
 def split_by_level(series, multiindex):
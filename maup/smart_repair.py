@@ -1,6 +1,7 @@
 import math
 import warnings
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy
 import pandas
@@ -23,10 +24,16 @@ from tqdm import tqdm, TqdmWarning
 
 from .adjacencies import adjacencies
 from .assign import assign
+from .coordinates import boundary_segment_endpoints
 from .indexed_geometries import get_geometries
 from .intersections import intersections
+from .parallel import CHUNKS_PER_JOB, effective_n_jobs, spatial_chunks
 from .progress_bar import progress
-from .repair import doctor, snap_to_grid, snap_multilinestring_to_grid
+from .repair import (
+    doctor,
+    snap_to_grid,
+    snap_multilinestring_to_grid,
+)
 
 warnings.filterwarnings("ignore", "GeoSeries.isna", UserWarning)
 warnings.filterwarnings("ignore", category=TqdmWarning)
@@ -55,6 +62,9 @@ def smart_repair(
     disconnection_threshold=0.0001,
     nest_within_regions=None,
     min_rook_length=None,
+    tiles=None,
+    tile_size=None,
+    n_jobs=None,
 ):
     """
     Repairs topology issues (overlaps, gaps, invalid polygons) in a geopandas
@@ -90,6 +100,20 @@ def smart_repair(
         disconnection_threshold times the area of the largest connected component of
         their assigned geometry. Default threshold is 0.01%, and this seems to work
         well in practice.
+    (8) If nest_within_regions is given, the regions are repaired independently of
+        each other, and n_jobs > 1 repairs them in that many worker processes at once
+        (n_jobs = -1 uses all CPUs). Otherwise, n_jobs > 1 fills the gaps in that
+        many worker processes, in rounds of gaps that don't touch any common
+        geometry. Default value is None, which does everything in the current
+        process.
+    (9) For very large inputs, finding the overlaps and gaps in one go can run out of
+        memory. If tiles (a number of tiles per side, or a pair (tiles across, tiles
+        down)) or tile_size (the width and height of each tile, in the units of the
+        input's CRS) is given, the extent is cut up into a grid of tiles that are
+        processed separately (in n_jobs worker processes), and the pieces that straddle
+        the seams between tiles are put back together afterwards.  The overlaps and
+        gaps found are the same as without tiles, in the same order, so the result
+        is the same too.  Default values are None (no tiles).
     """
 
     # Keep a copy of the original input for comparisons later.
@@ -107,10 +131,9 @@ def smart_repair(
         )
 
     # Ensure that geometries are 2-D and not 3-D:
-    for i in geometries_df.index:
-        geometries_df.loc[i, "geometry"] = shapely.wkb.loads(
-            shapely.wkb.dumps(geometries_df.loc[i, "geometry"], output_dimension=2)
-        )
+    geometries_df["geometry"] = shapely.force_2d(
+        numpy.asarray(geometries_df["geometry"].values)
+    )
 
     # Ensure that crs is not geographic:
     if geometries_df.crs is not None:
@@ -146,18 +169,7 @@ def smart_repair(
     # Before doing anything else, make sure all polygons are valid, convert any empty
     # geometries to empty Polygons to avoid type errors, and remove any LineStrings and
     # MultiLineStrings.
-    for i in geometries_df.index:
-        geometries_df.loc[i, "geometry"] = make_valid(geometries_df.loc[i, "geometry"])
-        if geometries_df.loc[i, "geometry"] is None:
-            geometries_df.loc[i, "geometry"] = Polygon()
-        if geometries_df.loc[i, "geometry"].geom_type == "GeometryCollection":
-            geometries_df.loc[i, "geometry"] = union_all(
-                [
-                    x
-                    for x in geometries_df.loc[i, "geometry"].geoms
-                    if x.geom_type in ("Polygon", "MultiPolygon")
-                ]
-            )
+    geometries_df["geometry"] = make_valid_polygons(geometries_df["geometry"])
 
     # If snapped is True, snap all polygon vertices to a grid of size no more than
     # 10^(-snap_precision) times the max of width/height of the entire extent of the input.
@@ -188,31 +200,9 @@ def smart_repair(
 
         # Snapping could possibly have created some invalid polygons, so do another round
         # of validity checks - and do a validity check for regions as well, if applicable.
-        for i in geometries_df.index:
-            geometries_df.loc[i, "geometry"] = make_valid(
-                geometries_df.loc[i, "geometry"]
-            )
-            if geometries_df.loc[i, "geometry"].geom_type == "GeometryCollection":
-                geometries_df.loc[i, "geometry"] = union_all(
-                    [
-                        x
-                        for x in geometries_df.loc[i, "geometry"].geoms
-                        if x.geom_type in ("Polygon", "MultiPolygon")
-                    ]
-                )
+        geometries_df["geometry"] = make_valid_polygons(geometries_df["geometry"])
         if nest_within_regions is not None:
-            for i in regions_df.index:
-                regions_df.loc[i, "geometry"] = make_valid(
-                    regions_df.loc[i, "geometry"]
-                )
-                if regions_df.loc[i, "geometry"].geom_type == "GeometryCollection":
-                    regions_df.loc[i, "geometry"] = union_all(
-                        [
-                            x
-                            for x in regions_df.loc[i, "geometry"].geoms
-                            if x.geom_type in ("Polygon", "MultiPolygon")
-                        ]
-                    )
+            regions_df["geometry"] = make_valid_polygons(regions_df["geometry"])
         print(
             "Snapping all geometries to a grid with precision 10^(",
             snap_magnitude,
@@ -224,7 +214,12 @@ def smart_repair(
 
     # Construct data about overlaps of all orders, plus holes.
     overlap_tower, holes_df = building_blocks(
-        geometries_df, snap_magnitude=snap_magnitude, nest_within_regions=regions_df
+        geometries_df,
+        snap_magnitude=snap_magnitude,
+        nest_within_regions=regions_df,
+        tiles=tiles,
+        tile_size=tile_size,
+        n_jobs=n_jobs,
     )
 
     # Use data from the overlap tower to rebuild geometries with no overlaps.
@@ -256,7 +251,9 @@ def smart_repair(
                 )
 
             print("Filling gaps...")
-            reconstructed_df = smart_close_gaps(reconstructed_df, holes_df)
+            reconstructed_df = smart_close_gaps(
+                reconstructed_df, holes_df, n_jobs=n_jobs
+            )
 
     else:
         if fill_gaps:
@@ -269,63 +266,60 @@ def smart_repair(
             geometries_df.geometry, regions_df.geometry
         )
 
-        for r_ind in nest_within_regions.index:
-            geometries_this_region_indices = [
-                g_ind
-                for g_ind in geometries_df.index
-                if geometries_to_regions_assignment[g_ind] == r_ind
-            ]
-            geometries_this_region_df = geometries_df.loc[
-                geometries_this_region_indices
-            ]
-
-            overlap_tower_this_region = []
-            for i in range(len(overlap_tower)):
-                overlap_tower_this_region.append(
-                    overlap_tower[i][overlap_tower[i]["region"] == r_ind]
-                )
+        # Split everything up by region, so that each region can be repaired on its
+        # own (and possibly in a separate process).
+        geometry_regions = regions_df.index.get_indexer(
+            geometries_to_regions_assignment
+        )
+        # (Geometries that aren't assigned to any region sort first, before the
+        # first boundary, and are left alone.)
+        order = numpy.argsort(geometry_regions, kind="stable")
+        boundaries = numpy.searchsorted(
+            geometry_regions[order], numpy.arange(len(regions_df) + 1)
+        )
+        geometries_by_region = [
+            order[boundaries[r_pos] : boundaries[r_pos + 1]]
+            for r_pos in range(len(regions_df))
+        ]
+        pieces_by_region = overlap_tower.pieces_by_region(len(regions_df))
 
-            reconstructed_this_region_df = reconstruct_from_overlap_tower(
-                geometries_this_region_df, overlap_tower_this_region, nested=True
+        region_arguments = [
+            (
+                geometries_df.iloc[geometries_by_region[r_pos]],
+                overlap_tower.take(pieces_by_region[r_pos]),
+                holes_df[holes_df["region"] == r_ind] if fill_gaps else None,
             )
+            for r_pos, r_ind in enumerate(regions_df.index)
+        ]
+        region_results = map_regions(
+            region_arguments,
+            n_jobs,
+            fill_gaps_threshold=fill_gaps_threshold,
+        )
 
-            if fill_gaps:
-                holes_this_region_df = holes_df[holes_df["region"] == r_ind]
-                # First remove any holes above the relative area threshold (if any).
-                # Also remove any non-simply connected holes since our algorithm breaks
-                # down in that case, regardless of whether or not a relative area
-                # threshold has been set.
-                (
-                    holes_this_region_df,
-                    num_holes_dropped_this_region_nsc,
+        for r_ind, (
+            reconstructed_this_region,
+            num_holes_dropped_this_region_nsc,
+            num_holes_dropped_this_region_aat,
+        ) in zip(regions_df.index, region_results):
+            if num_holes_dropped_this_region_aat > 0:
+                print(
                     num_holes_dropped_this_region_aat,
-                ) = drop_bad_holes(
-                    reconstructed_this_region_df,
-                    holes_this_region_df,
-                    fill_gaps_threshold=fill_gaps_threshold,
+                    "gaps in region",
+                    r_ind,
+                    "will remain unfilled, because they exceed the area threshold.",
                 )
-                if num_holes_dropped_this_region_aat > 0:
-                    print(
-                        num_holes_dropped_this_region_aat,
-                        "gaps in region",
-                        r_ind,
-                        "will remain unfilled, because they exceed the area threshold.",
-                    )
-                if num_holes_dropped_this_region_nsc > 0:
-                    print(
-                        num_holes_dropped_this_region_nsc,
-                        "gaps in region",
-                        r_ind,
-                        "will remain unfilled, because they are not simply connected.",
-                    )
-
-                reconstructed_this_region_df = smart_close_gaps(
-                    reconstructed_this_region_df, holes_this_region_df
+            if num_holes_dropped_this_region_nsc > 0:
+                print(
+                    num_holes_dropped_this_region_nsc,
+                    "gaps in region",
+                    r_ind,
+                    "will remain unfilled, because they are not simply connected.",
                 )
 
-            reconstructed_df.loc[
-                list(reconstructed_this_region_df.index), "geometry"
-            ] = reconstructed_this_region_df["geometry"]
+        if region_results:
+            reconstructed = pandas.concat([result[0] for result in region_results])
+            reconstructed_df.loc[reconstructed.index, "geometry"] = reconstructed
 
     # Check for geometries that have become (more) disconnected, generally with an extra
     # component of negligible area.  If any are found and the area is negligible,
@@ -501,6 +495,29 @@ def smart_repair(
 #########
 
 
+def make_valid_polygons(geometries):
+    """
+    Applies shapely.make_valid to all of the geometries at once, converts missing
+    geometries to empty Polygons, and replaces each GeometryCollection by the union of
+    its Polygons and MultiPolygons (dropping any LineStrings, Points, etc.).
+    """
+    geometries = shapely.make_valid(numpy.array(geometries, dtype="object"))
+    geometries[shapely.is_missing(geometries)] = Polygon()
+
+    collections = numpy.flatnonzero(shapely.get_type_id(geometries) == 7)
+    if len(collections) > 0:
+        parts, part_index = shapely.get_parts(
+            geometries[collections], return_index=True
+        )
+        polygonal = numpy.isin(shapely.get_type_id(parts), (3, 6))
+        parts, part_index = parts[polygonal], part_index[polygonal]
+        starts = numpy.searchsorted(part_index, numpy.arange(len(collections) + 1))
+        for k, position in enumerate(collections):
+            geometries[position] = union_all(parts[starts[k] : starts[k + 1]])
+
+    return geometries
+
+
 def num_components(geom):
     """Counts the number of connected components of a shapely object."""
     if geom.is_empty:
@@ -520,13 +537,64 @@ def contain_each_other(poly1, poly2):
     return poly1.contains(poly2) and poly2.contains(poly1)
 
 
-def building_blocks(geometries_df, snap_magnitude=None, nest_within_regions=None):
+class GeoDataFrameBuilder:
+    """
+    Collects the rows of a GeoDataFrame with the given columns (one of which must be
+    "geometry") into one list per column, and builds the GeoDataFrame just once, in
+    finalize.  Unlike growing a GeoDataFrame with pandas.concat in a loop, which
+    copies every row collected so far each time, this takes time linear in the
+    number of rows.
+    """
+
+    def __init__(self, columns, crs=None):
+        self.columns = {column: [] for column in columns}
+        self.crs = crs
+
+    def __len__(self):
+        return len(self.columns["geometry"])
+
+    def append(self, **row):
+        """Add one row, given as a value for each column."""
+        for column, values in self.columns.items():
+            values.append(row[column])
+
+    def extend(self, **rows):
+        """
+        Add several rows, given as a sequence of values for each column; a scalar
+        value is used for every row.
+        """
+        num_rows = len(rows["geometry"])
+        for column, values in self.columns.items():
+            if numpy.ndim(rows[column]) == 0:
+                values.extend([rows[column]] * num_rows)
+            else:
+                values.extend(rows[column])
+
+    def finalize(self):
+        data = {column: values for column, values in self.columns.items()}
+        data["geometry"] = GeoSeries(data["geometry"], crs=self.crs)
+        return GeoDataFrame(data, geometry="geometry", crs=self.crs)
+
+
+def building_blocks(
+    geometries_df,
+    snap_magnitude=None,
+    nest_within_regions=None,
+    tiles=None,
+    tile_size=None,
+    n_jobs=None,
+):
     """
     Partitions the extent of the input via all boundaries of all geometries
     (and regions, if nest_within_regions is a GeoDataFrame/GeoSeries of region
     boundaries); associates to each polygon in the partition the set of polygons in the
     original shapefile whose intersection created it, and organizes this data according
     to order of the overlaps. (Order zero = hole)
+
+    If tiles or tile_size is given, the boundaries are cut up into a grid of tiles that
+    are processed separately (in n_jobs worker processes), so that the whole set of
+    boundaries never has to be noded at once. The pieces are the same either way, and
+    come in the same order.
     """
     if isinstance(geometries_df, GeoDataFrame) is False:
         raise TypeError("Primary input to building_blocks must be a GeoDataFrame.")
@@ -540,177 +608,120 @@ def building_blocks(geometries_df, snap_magnitude=None, nest_within_regions=None
         else:
             regions_df = nest_within_regions.copy()
 
-    # Make a list of all the boundaries of all the polygons.
-    # This won't work properly with MultiPolygons, so explode first:
-    boundaries = []
-    geometries_exploded_df = geometries_df.explode(index_parts=False).reset_index(
-        drop=True
+    # Cut the extent up along all the boundaries of all the polygons (and regions).
+    boundaries = boundary_lines(
+        geometries_df, regions_df if nest_within_regions is not None else None
     )
-    for i in geometries_exploded_df.index:
-        boundaries.append(shapely.boundary(geometries_exploded_df.loc[i, "geometry"]))
-
-    # Include region boundaries if applicable:
-    if nest_within_regions is not None:
-        regions_exploded_df = regions_df.explode(index_parts=False).reset_index(
-            drop=True
-        )
-        for i in regions_exploded_df.index:
-            boundaries.append(shapely.boundary(regions_exploded_df.loc[i, "geometry"]))
-
-    boundaries_exploded = []
-    for geom in boundaries:
-        if geom.geom_type == "LineString":
-            boundaries_exploded.append(geom)
-        elif geom.geom_type == "MultiLineString":
-            boundaries_exploded += list(geom.geoms)
-    boundaries_union = shapely.node(MultiLineString(boundaries_exploded))
-
-    # Snap the noded boundaries to a grid of size snap_magnitude-1 and re-node:
-    if snap_magnitude is not None:
-        boundaries_2 = snap_multilinestring_to_grid(
-            boundaries_union, n=snap_magnitude - 1
+    if tiles is None and tile_size is None:
+        pieces = polygonize_boundaries(boundaries, snap_magnitude)
+    else:
+        pieces = tiled_polygonize_boundaries(
+            boundaries,
+            snap_magnitude,
+            tile_grid(boundaries, tiles=tiles, tile_size=tile_size),
+            n_jobs=n_jobs,
         )
-        boundaries_2_exploded = []
-        for geom in boundaries_2.geoms:
-            if geom.geom_type == "LineString":
-                boundaries_2_exploded.append(geom)
-            elif geom.geom_type == "MultiLineString":
-                boundaries_2_exploded += list(geom.geoms)
-        boundaries_union = shapely.node(MultiLineString(boundaries_2_exploded))
-
-    # Create a geodataframe with all the pieces created by overlaps of all orders,
-    # together with a set for each piece consisting of the polygons that created the overlap.
+
+    # Create a geodataframe with all the pieces created by overlaps of all orders.
     pieces_df = GeoDataFrame(
-        columns=["polygon indices"],
-        geometry=GeoSeries(list(polygonize(boundaries_union))),
+        geometry=GeoSeries(pieces),
         crs=geometries_df.crs,
     )
 
-    pieces_df["polygon indices"] = [set() for x in range(len(pieces_df.index))]
-
-    # Add a column to indicate the region for each piece; if there are no regions the
-    # entries will remain as None.
-    pieces_df["region"] = None
+    # Label each piece by the geometries (and region, if applicable) that contain a
+    # representative point of the piece. All of the points are computed at once and
+    # matched up with the geometries by a single query of each spatial index.
+    print("Identifying overlaps...")
+    piece_points = shapely.point_on_surface(numpy.asarray(pieces_df.geometry.values))
 
     g_spatial_index = STRtree(geometries_df["geometry"])
-    g_index_by_iloc = dict(
-        (i, list(geometries_df.index)[i]) for i in range(len(geometries_df))
+    point_positions, geom_positions = g_spatial_index.query(
+        piece_points, predicate="intersects"
     )
 
-    # If region boundaries are included, also create an STRtree for the regions
-    # and assign the main geometries to regions by largest area overlap.
+    # If region boundaries are included, identify the region for each piece.
+    # Note that "None" is a possibility, and that each piece will belong to a unique
+    # region because the regions GeoDataFrame/GeoSeries MUST be clean.
+    # While determining which geometries each piece is contained in, omit any
+    # geometries that are assigned to a region other than the one the piece is
+    # contained in.
     if nest_within_regions is not None:
         r_spatial_index = STRtree(regions_df["geometry"])
-        r_index_by_iloc = dict(
-            (i, list(regions_df.index)[i]) for i in range(len(regions_df))
+        region_point_positions, region_positions = r_spatial_index.query(
+            piece_points, predicate="intersects"
         )
+        piece_region_positions = numpy.full(len(pieces_df), -1)
+        piece_region_positions[region_point_positions] = region_positions
+
         geometries_to_regions_assignment = assign(
             geometries_df.geometry, regions_df.geometry
         )
-
-    print("Identifying overlaps...")
-    for i in progress(pieces_df.index, len(pieces_df.index)):
-        # If region boundaries are included, identify the region for each piece.
-        # Note that "None" is a possibility, and that each piece will belong to a unique
-        # region because the regions GeoDataFrame/GeoSeries MUST be clean.
-        if nest_within_regions is not None:
-            possible_region_integer_indices = list(
-                set(r_spatial_index.query(pieces_df.loc[i, "geometry"]).ravel())
-            )
-            possible_region_indices = [
-                r_index_by_iloc[k] for k in possible_region_integer_indices
-            ]
-
-            for j in possible_region_indices:
-                if (
-                    pieces_df.loc[i, "geometry"]
-                    .representative_point()
-                    .intersects(regions_df.loc[j, "geometry"])
-                ):
-                    pieces_df.loc[i, "region"] = j
-
-        # Now identify the set of geometries in the main geometry that each piece is
-        # contained in. If region boundaries are included, then while determining which
-        # geometries each piece is contained in, omit any geometries that are
-        # assigned to a region other than the one the piece is contained in.
-        possible_geom_integer_indices = list(
-            set(g_spatial_index.query(pieces_df.loc[i, "geometry"]).ravel())
+        geom_region_positions = regions_df.index.get_indexer(
+            geometries_to_regions_assignment.reindex(geometries_df.index)
         )
-        possible_geom_indices = [
-            g_index_by_iloc[k] for k in possible_geom_integer_indices
-        ]
-
-        for j in possible_geom_indices:
-            if nest_within_regions is not None:
-                if (
-                    pieces_df.loc[i, "geometry"]
-                    .representative_point()
-                    .intersects(geometries_df.loc[j, "geometry"])
-                ):
-                    if (
-                        geometries_to_regions_assignment[j]
-                        == pieces_df.loc[i, "region"]
-                    ):
-                        pieces_df.at[i, "polygon indices"] = pieces_df.at[
-                            i, "polygon indices"
-                        ].union({j})
-            else:
-                if (
-                    pieces_df.loc[i, "geometry"]
-                    .representative_point()
-                    .intersects(geometries_df.loc[j, "geometry"])
-                ):
-                    pieces_df.at[i, "polygon indices"] = pieces_df.at[
-                        i, "polygon indices"
-                    ].union({j})
 
-    # Organize this info into separate GeoDataFrames for overlaps of all orders - including
-    # order zero, which corresponds to gaps.
-    # This will be easier if we temporarily add a column for overlap degree.
-    overlap_degree_list = [len(x) for x in pieces_df["polygon indices"]]
-    pieces_df["overlap degree"] = overlap_degree_list
+        same_region = (piece_region_positions[point_positions] >= 0) & (
+            piece_region_positions[point_positions]
+            == geom_region_positions[geom_positions]
+        )
+        point_positions = point_positions[same_region]
+        geom_positions = geom_positions[same_region]
+
+        has_region = piece_region_positions >= 0
+        pieces_df["region"] = pandas.Series(
+            numpy.where(
+                has_region,
+                regions_df.index[piece_region_positions].to_numpy(dtype="object"),
+                None,
+            ),
+            index=pieces_df.index,
+            dtype="object",
+        )
+    else:
+        # If there are no regions, the entries remain as None.
+        pieces_df["region"] = None
+
+    # Count the geometries containing each piece to get the overlap degree of each
+    # piece, and list them piece by piece for the overlap tower.
+    order = numpy.argsort(point_positions, kind="stable")
+    overlap_degrees = numpy.bincount(point_positions, minlength=len(pieces_df))
+    offsets = numpy.concatenate([[0], numpy.cumsum(overlap_degrees)])
+    overlap_tower = OverlapTower(
+        numpy.asarray(pieces_df.geometry.values),
+        offsets,
+        geom_positions[order],
+        geometries_df.index,
+        regions=piece_region_positions if nest_within_regions is not None else None,
+    )
 
     # Here are the gaps:
-    holes_df = (pieces_df[pieces_df["overlap degree"] == 0]).reset_index(drop=True)
+    is_hole = overlap_degrees == 0
+    holes_df = pieces_df[is_hole].reset_index(drop=True)
 
     # If region boundaries are included, drop all the polygons that didn't fall into any
     # region, and also take the (exploded) unary unions of all the gaps in each region,
     # since some pieces of geometries from other regions may now be gaps that are adjacent
     # to other gaps.
     if nest_within_regions is not None:
-        pieces_df = pieces_df[~pieces_df["region"].isna()].reset_index(drop=True)
+        overlap_tower = overlap_tower.take(
+            numpy.flatnonzero(~is_hole & has_region), renumber=True
+        )
         holes_df = holes_df[~holes_df["region"].isna()].reset_index(drop=True)
 
-        consolidated_holes_df = GeoDataFrame(
-            columns=["polygon indices", "geometry", "region", "overlap degree"],
-            geometry="geometry",
-            crs=holes_df.crs,
-        )
+        consolidated_holes = GeoDataFrameBuilder(["geometry", "region"], holes_df.crs)
+        holes_by_region = dict(list(holes_df.groupby("region")["geometry"]))
         for r_ind in regions_df.index:
-            this_region_holes_df = holes_df[holes_df["region"] == r_ind]
-            this_region_consolidated_holes = (
-                GeoSeries([union_all(this_region_holes_df["geometry"])])
-                .explode(index_parts=False)
-                .reset_index(drop=True)
-            )
-            this_region_consolidated_holes_df = GeoDataFrame(
-                geometry=this_region_consolidated_holes, crs=holes_df.crs
-            )
-
-            this_region_consolidated_holes_df.insert(0, "polygon indices", None)
-            this_region_consolidated_holes_df["polygon indices"] = [
-                set() for x in range(len(this_region_consolidated_holes_df.index))
-            ]
-            this_region_consolidated_holes_df.insert(2, "region", r_ind)
-            this_region_consolidated_holes_df.insert(2, "overlap degree", 0)
-
-            consolidated_holes_df = pandas.concat(
-                [consolidated_holes_df, this_region_consolidated_holes_df]
-            ).reset_index(drop=True)
+            if r_ind in holes_by_region:
+                consolidated_holes.extend(
+                    geometry=shapely.get_parts(union_all(holes_by_region[r_ind])),
+                    region=r_ind,
+                )
 
-        holes_df = consolidated_holes_df
+        holes_df = consolidated_holes.finalize()
 
     else:
+        overlap_tower = overlap_tower.take(numpy.flatnonzero(~is_hole), renumber=True)
+
         # Do the same thing we did for holes within each region to consolidate them:
         all_consolidated_holes = (
             GeoSeries([union_all(holes_df["geometry"])])
@@ -720,32 +731,499 @@ def building_blocks(geometries_df, snap_magnitude=None, nest_within_regions=None
         all_consolidated_holes_df = GeoDataFrame(
             geometry=all_consolidated_holes, crs=holes_df.crs
         )
+        all_consolidated_holes_df.insert(1, "region", None)
+
+        holes_df = all_consolidated_holes_df
+
+    return overlap_tower, holes_df
+
+
+def boundary_lines(geometries_df, regions_df=None):
+    """
+    An array of all the boundary rings of all the (parts of the) geometries, followed
+    by those of the regions if regions_df is not None.
+    """
+    geometries = numpy.asarray(geometries_df.geometry.values)
+    if regions_df is not None:
+        geometries = numpy.concatenate(
+            [geometries, numpy.asarray(regions_df.geometry.values)]
+        )
+    lines = shapely.get_parts(shapely.boundary(shapely.get_parts(geometries)))
+    return lines[shapely.get_type_id(lines) == 1]
+
+
+def noded_boundaries(lines, snap_magnitude=None):
+    """
+    Nodes the lines, and if snap_magnitude is not None, snaps the noded lines to a grid
+    of size 10^(snap_magnitude - 1) and nodes them again.
+    """
+    noded = shapely.node(MultiLineString(list(lines)))
+    if snap_magnitude is not None:
+        snapped = snap_multilinestring_to_grid(noded, n=snap_magnitude - 1)
+        noded = shapely.node(MultiLineString(list(shapely.get_parts(snapped))))
+    return noded
+
+
+def polygonize_boundaries(lines, snap_magnitude=None):
+    """All the polygons that the (noded) lines cut the plane into."""
+    return numpy.array(
+        list(polygonize(noded_boundaries(lines, snap_magnitude))), dtype="object"
+    )
+
+
+def tile_grid(lines, tiles=None, tile_size=None):
+    """
+    Boxes covering the extent of the lines (plus a small margin), either tiles[0] by
+    tiles[1] of them (or tiles by tiles, if tiles is a number) or as many as it takes
+    for each one to be at most tile_size across.
+    """
+    if tiles is not None and tile_size is not None:
+        raise ValueError("Only one of tiles and tile_size can be given.")
+
+    xmin, ymin, xmax, ymax = shapely.total_bounds(lines)
+    margin = tile_margin(lines)
+    xmin, ymin, xmax, ymax = xmin - margin, ymin - margin, xmax + margin, ymax + margin
+    if tile_size is not None:
+        if tile_size <= 0:
+            raise ValueError("tile_size must be positive.")
+        tiles = (
+            math.ceil((xmax - xmin) / tile_size),
+            math.ceil((ymax - ymin) / tile_size),
+        )
+    elif numpy.ndim(tiles) == 0:
+        tiles = (tiles, tiles)
+    if min(tiles) < 1:
+        raise ValueError("There must be at least one tile in each direction.")
+
+    xs = numpy.linspace(xmin, xmax, int(tiles[0]) + 1)
+    ys = numpy.linspace(ymin, ymax, int(tiles[1]) + 1)
+    x0, y0 = numpy.meshgrid(xs[:-1], ys[:-1], indexing="ij")
+    x1, y1 = numpy.meshgrid(xs[1:], ys[1:], indexing="ij")
+    return shapely.box(x0.ravel(), y0.ravel(), x1.ravel(), y1.ravel())
 
-        all_consolidated_holes_df.insert(0, "polygon indices", None)
-        all_consolidated_holes_df["polygon indices"] = [
-            set() for x in range(len(all_consolidated_holes_df.index))
+
+def tile_margin(lines):
+    """
+    How far outside of a tile to look for lines that can affect the polygons inside
+    it. This is far larger than the distance that any vertex moves by when the noded
+    lines are snapped to the grid.
+    """
+    xmin, ymin, xmax, ymax = shapely.total_bounds(lines)
+    return 1e-6 * max(xmax - xmin, ymax - ymin, 1e-300)
+
+
+def tiled_polygonize_boundaries(lines, snap_magnitude, boxes, n_jobs=None):
+    """
+    The same polygons as polygonize_boundaries(lines, snap_magnitude), in the same
+    order, computed tile by tile.
+
+    Each tile nodes only the lines near it, together with its own outline, and keeps
+    the polygons that lie inside it without touching its outline: these are exactly
+    the polygons of the full partition, because every line that could cut them was
+    included. The polygons that were cut by a tile outline ("fragments") go to a seam
+    pass. Fragments on either side of a seam that are inside the same rings and share
+    a stretch of the seam are linked, and the linked groups that reach the outline of
+    the whole grid are the outside of all the geometries. Each remaining group is part
+    of a bounded polygon of the partition, which is recovered exactly by noding all of
+    the lines near the group and picking out the polygon containing its fragments.
+    Finally, the polygons are sorted by the keys from polygonize_order.
+    """
+    if len(lines) == 0:
+        return numpy.array([], dtype="object")
+
+    margin = tile_margin(lines)
+    tolerance = 1e-3 * margin
+    line_index = STRtree(lines)
+    tile_positions = [
+        numpy.sort(line_index.query(shapely.buffer(box, margin, join_style=2)))
+        for box in boxes
+    ]
+
+    n_jobs = effective_n_jobs(n_jobs)
+    results = map_tiles(
+        pieces_of_tile,
+        [
+            (lines[positions], positions, box, snap_magnitude, tolerance)
+            for positions, box in zip(tile_positions, boxes)
+        ],
+        n_jobs,
+    )
+
+    pieces = [result[0] for result in results]
+    piece_keys = [result[1] for result in results]
+    fragments = numpy.concatenate([result[2] for result in results])
+    fragment_tiles = numpy.repeat(
+        numpy.arange(len(boxes)), [len(result[2]) for result in results]
+    )
+    if len(fragments) == 0:
+        return _in_order(pieces, piece_keys)
+
+    # Find out which rings enclose each fragment, by way of a point inside it.
+    fragment_points = shapely.point_on_surface(fragments)
+    ring_coords, ring_indices = shapely.get_coordinates(
+        lines[shapely.is_closed(lines)], return_index=True
+    )
+    point_positions, ring_positions = STRtree(
+        shapely.polygons(shapely.linearrings(ring_coords, indices=ring_indices))
+    ).query(fragment_points, predicate="intersects")
+    order = numpy.lexsort((ring_positions, point_positions))
+    containing_rings = numpy.split(
+        ring_positions[order],
+        numpy.searchsorted(point_positions[order], numpy.arange(1, len(fragments))),
+    )
+    keys = [tuple(rings) for rings in containing_rings]
+
+    # Link the fragments in neighboring tiles that share a stretch of a seam.
+    first, second = STRtree(fragments).query(fragments, predicate="intersects")
+    keep = fragment_tiles[first] < fragment_tiles[second]
+    first, second = first[keep], second[keep]
+    shared = shapely.length(shapely.intersection(fragments[first], fragments[second]))
+    group_of = numpy.arange(len(fragments))
+    for i, j in zip(first[shared > 0], second[shared > 0]):
+        if keys[i] == keys[j]:
+            _link(group_of, i, j)
+    groups = numpy.array([_find(group_of, i) for i in range(len(fragments))])
+
+    # Drop the groups on the outside of everything.
+    grid_outline = shapely.box(*shapely.total_bounds(boxes)).exterior
+    outside = numpy.isin(groups, groups[shapely.intersects(fragments, grid_outline)])
+    groups, fragment_points = groups[~outside], fragment_points[~outside]
+    fragments = fragments[~outside]
+    if len(fragments) == 0:
+        return _in_order(pieces, piece_keys)
+
+    # Node the lines near each group separately, and pick out the polygon that
+    # contains its fragments.
+    group_bounds = pandas.DataFrame(
+        shapely.bounds(fragments), columns=["xmin", "ymin", "xmax", "ymax"]
+    ).groupby(groups)
+    group_boxes = shapely.box(
+        group_bounds["xmin"].min() - margin,
+        group_bounds["ymin"].min() - margin,
+        group_bounds["xmax"].max() + margin,
+        group_bounds["ymax"].max() + margin,
+    )
+    group_points = fragment_points[numpy.unique(groups, return_index=True)[1]]
+    seam_positions = [numpy.sort(line_index.query(box)) for box in group_boxes]
+    results = map_tiles(
+        pieces_of_seam,
+        [
+            (lines[positions], positions, point, snap_magnitude, tolerance)
+            for positions, point in zip(seam_positions, group_points)
+        ],
+        n_jobs,
+    )
+
+    return _in_order(
+        pieces + [result[0] for result in results],
+        piece_keys + [result[1] for result in results],
+    )
+
+
+def _in_order(pieces, keys):
+    pieces, keys = numpy.concatenate(pieces), numpy.concatenate(keys)
+    return pieces[numpy.lexsort(keys.T[::-1])]
+
+
+def map_tiles(function, tile_arguments, n_jobs):
+    """
+    Run function on each tuple of arguments in tile_arguments, in a pool of n_jobs
+    worker processes if n_jobs is more than one. The results are returned in the
+    same order as tile_arguments.
+    """
+    if n_jobs == 1 or len(tile_arguments) < 2:
+        return [
+            function(*arguments)
+            for arguments in progress(tile_arguments, len(tile_arguments))
         ]
-        all_consolidated_holes_df.insert(2, "region", None)
-        all_consolidated_holes_df.insert(2, "overlap degree", 0)
 
-        holes_df = all_consolidated_holes_df
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_initialize_region_worker
+    ) as executor:
+        return list(
+            executor.map(
+                function,
+                *zip(*tile_arguments),
+                chunksize=max(1, len(tile_arguments) // (n_jobs * CHUNKS_PER_JOB)),
+            )
+        )
+
 
-    # Here is a list of GeoDataFrames, one consisting of all overlaps of each order:
-    overlap_tower = []
+def pieces_of_tile(lines, positions, box, snap_magnitude=None, tolerance=0):
+    """
+    Nodes the lines (which are the lines at the given positions of all of them)
+    together with the outline of the box, and returns the polygons inside the box
+    that don't touch its outline with their keys from polygonize_order, followed by
+    the polygons inside the box that do touch its outline.
+    """
+    outline = box.exterior
+    noded = shapely.get_parts(noded_boundaries(lines, snap_magnitude))
+    with_outline = shapely.node(MultiLineString(list(noded) + [outline]))
+    polygons = numpy.array(list(polygonize(with_outline)), dtype="object")
+    if len(polygons) == 0:
+        return polygons, numpy.empty((0, 3)), polygons
+    inside = shapely.within(shapely.point_on_surface(polygons), box)
+    on_outline = shapely.intersects(polygons, outline)
+    pieces = polygons[inside & ~on_outline]
+    return (
+        pieces,
+        polygonize_order(pieces, noded, lines, positions, tolerance),
+        polygons[inside & on_outline],
+    )
 
-    for i in range(max(pieces_df["overlap degree"])):
-        overlap_tower.append(pieces_df[pieces_df["overlap degree"] == i + 1])
 
-    # Drop unnecessary "overlap degree" column and reindex each GeoDataFrame:
-    for i in range(len(overlap_tower)):
-        del overlap_tower[i]["overlap degree"]
-        overlap_tower[i] = overlap_tower[i].reset_index(drop=True)
-    del holes_df["overlap degree"]
+def pieces_of_seam(lines, positions, point, snap_magnitude=None, tolerance=0):
+    """
+    Nodes the lines (which are the lines at the given positions of all of them), and
+    returns the polygon containing the point with its key from polygonize_order.
+    """
+    noded = shapely.get_parts(noded_boundaries(lines, snap_magnitude))
+    polygons = numpy.array(list(polygonize(noded)), dtype="object")
+    pieces = polygons[shapely.contains(polygons, point)]
+    return pieces, polygonize_order(pieces, noded, lines, positions, tolerance)
 
-    # Drop the "polygon indices" column in the holes GeoDataFrame:
-    del holes_df["polygon indices"]
 
-    return overlap_tower, holes_df
+def polygonize_order(polygons, noded, lines, positions, tolerance=0):
+    """
+    Keys that sort polygons made from the noded lines into the order that
+    polygonize_boundaries returns them in for all of the lines, of which lines are
+    the ones at the given positions.
+
+    polygonize returns the polygons in order of the first noded line (forwards, then
+    backwards) in each of their exteriors, which is where the exterior starts. And
+    shapely.node returns the pieces of each line in turn, in order along it, leaving
+    out the ones that an earlier line already has. So a noded line comes in the same
+    place among the noded lines of all of the lines as after the first line that it
+    lies on (up to tolerance, for the vertices moved by snapping), by how far along
+    that line it is.
+    """
+    if len(polygons) == 0:
+        return numpy.empty((0, 3))
+
+    coords, line_indices = shapely.get_coordinates(noded, return_index=True)
+    starts = numpy.searchsorted(line_indices, numpy.arange(len(noded)))
+    ends = numpy.append(starts[1:], len(coords)) - 1
+    forwards = {
+        tuple(segment): i
+        for i, segment in enumerate(
+            numpy.hstack([coords[starts], coords[starts + 1]]).tolist()
+        )
+    }
+    backwards = {
+        tuple(segment): i
+        for i, segment in enumerate(
+            numpy.hstack([coords[ends], coords[ends - 1]]).tolist()
+        )
+    }
+
+    # The first noded line in the exterior of each polygon, and which way it goes.
+    exterior_coords, exterior_indices = shapely.get_coordinates(
+        shapely.get_exterior_ring(polygons), return_index=True
+    )
+    firsts = numpy.searchsorted(exterior_indices, numpy.arange(len(polygons)))
+    first_segments = [
+        tuple(segment)
+        for segment in numpy.hstack(
+            [exterior_coords[firsts], exterior_coords[firsts + 1]]
+        ).tolist()
+    ]
+    is_backwards = numpy.array([segment not in forwards for segment in first_segments])
+    first_lines = numpy.array(
+        [forwards.get(segment, backwards.get(segment)) for segment in first_segments]
+    )
+
+    # The first line that each of those lies on, and how far along it it is.
+    midpoints = shapely.points(
+        (coords[starts[first_lines]] + coords[starts[first_lines] + 1]) / 2
+    )
+    line_index = STRtree(lines)
+    point_positions, line_positions = line_index.query(
+        midpoints, predicate="dwithin", distance=tolerance
+    )
+    owners = numpy.full(len(polygons), len(lines))
+    numpy.minimum.at(owners, point_positions, line_positions)
+    missing = owners == len(lines)
+    if missing.any():
+        owners[missing] = line_index.query_nearest(
+            midpoints[missing], all_matches=False
+        )[1]
+
+    return numpy.column_stack(
+        [
+            positions[owners],
+            shapely.line_locate_point(lines[owners], midpoints),
+            is_backwards,
+        ]
+    )
+
+
+def _find(group_of, i):
+    while group_of[i] != i:
+        group_of[i] = group_of[group_of[i]]
+        i = group_of[i]
+    return i
+
+
+def _link(group_of, i, j):
+    i, j = _find(group_of, i), _find(group_of, j)
+    if i != j:
+        group_of[max(i, j)] = min(i, j)
+
+
+class OverlapTower:
+    """
+    The pieces that building_blocks cuts the input into, stored as arrays:
+    geometries[i] is the ith piece, and members[offsets[i]:offsets[i + 1]] are the
+    positions (in polygons) of the polygons that contain it, so that the number of
+    these is the overlap degree of the piece. If the pieces are nested within
+    regions, regions[i] is the position of the region of the ith piece.
+
+    numbers[i] numbers the ith piece among the pieces of the same overlap degree, in
+    the order they were in when the tower was built. Slices of the tower keep these
+    numbers, so that the order in which reconstruct_from_overlap_tower considers the
+    overlaps doesn't depend on how the tower was sliced.
+
+    The tower is sliced by integer positions (see take and level) rather than by
+    filtering GeoDataFrames.
+    """
+
+    def __init__(
+        self, geometries, offsets, members, polygons, regions=None, numbers=None
+    ):
+        self.geometries = numpy.asarray(geometries, dtype="object")
+        self.offsets = numpy.asarray(offsets, dtype="int64")
+        self.members = numpy.asarray(members, dtype="int64")
+        self.polygons = pandas.Index(polygons)
+        if regions is None:
+            regions = numpy.full(len(self.geometries), -1)
+        self.regions = numpy.asarray(regions, dtype="int64")
+        self.degrees = numpy.diff(self.offsets)
+        if numbers is None:
+            order = numpy.argsort(self.degrees, kind="stable")
+            numbers = numpy.empty(len(self.degrees), dtype="int64")
+            numbers[order] = numpy.arange(len(order)) - numpy.searchsorted(
+                self.degrees[order], self.degrees[order]
+            )
+        self.numbers = numpy.asarray(numbers, dtype="int64")
+
+    def __len__(self):
+        return len(self.geometries)
+
+    @property
+    def max_degree(self):
+        return int(self.degrees.max()) if len(self) > 0 else 0
+
+    def members_of(self, piece):
+        """The labels of the polygons containing the piece at position piece."""
+        return list(
+            self.polygons[self.members[self.offsets[piece] : self.offsets[piece + 1]]]
+        )
+
+    def level(self, degree):
+        """The positions of the pieces with the given overlap degree."""
+        return numpy.flatnonzero(self.degrees == degree)
+
+    def take(self, positions, renumber=False):
+        """
+        A new OverlapTower with just the pieces at the given positions. The pieces
+        keep their numbers, unless renumber is True.
+        """
+        positions = numpy.asarray(positions, dtype="int64")
+        degrees = self.degrees[positions]
+        offsets = numpy.concatenate([[0], numpy.cumsum(degrees)])
+        # Position of each kept membership in self.members:
+        members = numpy.repeat(self.offsets[positions] - offsets[:-1], degrees)
+        members += numpy.arange(offsets[-1])
+        return OverlapTower(
+            self.geometries[positions],
+            offsets,
+            self.members[members],
+            self.polygons,
+            regions=self.regions[positions],
+            numbers=None if renumber else self.numbers[positions],
+        )
+
+    def pieces_by_region(self, num_regions):
+        """Splits the positions of the pieces by region: returns a list whose rth
+        entry holds the positions of the pieces in the region at position r."""
+        order = numpy.argsort(self.regions, kind="stable")
+        counts = numpy.bincount(self.regions[self.regions >= 0], minlength=num_regions)
+        starts = numpy.searchsorted(self.regions[order], 0)
+        return numpy.split(order[starts:], numpy.cumsum(counts)[:-1])
+
+
+def repair_region(geometries_df, overlap_tower, holes_df=None, fill_gaps_threshold=0.1):
+    """
+    Resolve overlaps among the geometries in a single region, and fill the holes in
+    holes_df (if it is not None). Returns the repaired geometries along with the
+    numbers of holes left unfilled because they are not simply connected or exceed
+    the area threshold, respectively.
+    """
+    reconstructed_df = reconstruct_from_overlap_tower(
+        geometries_df, overlap_tower, nested=True
+    )
+    num_holes_dropped_nsc, num_holes_dropped_aat = 0, 0
+
+    if holes_df is not None:
+        # First remove any holes above the relative area threshold (if any).
+        # Also remove any non-simply connected holes since our algorithm breaks
+        # down in that case, regardless of whether or not a relative area
+        # threshold has been set.
+        holes_df, num_holes_dropped_nsc, num_holes_dropped_aat = drop_bad_holes(
+            reconstructed_df, holes_df, fill_gaps_threshold=fill_gaps_threshold
+        )
+        reconstructed_df = smart_close_gaps(reconstructed_df, holes_df)
+
+    return reconstructed_df["geometry"], num_holes_dropped_nsc, num_holes_dropped_aat
+
+
+def map_regions(region_arguments, n_jobs=None, **options):
+    """
+    Run repair_region on each tuple of arguments in region_arguments, in a pool of
+    n_jobs worker processes if n_jobs asks for more than one. The results are
+    returned in the same order as region_arguments.
+    """
+    n_jobs = effective_n_jobs(n_jobs)
+    if n_jobs == 1 or len(region_arguments) < 2:
+        return [repair_region(*arguments, **options) for arguments in region_arguments]
+
+    # Send the biggest regions off first so that no worker is left with a big region
+    # at the very end.
+    sizes = [len(arguments[0]) for arguments in region_arguments]
+    order = numpy.argsort(sizes, kind="stable")[::-1]
+    results = [None] * len(region_arguments)
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_initialize_region_worker
+    ) as executor:
+        futures = {
+            executor.submit(repair_region, *region_arguments[r_pos], **options): r_pos
+            for r_pos in order
+        }
+        for future in progress(as_completed(futures), len(futures)):
+            results[futures[future]] = future.result()
+    return results
+
+
+# Set in worker processes, whose gap-filling progress bars would only garble each
+# other (and the main process's).
+_quiet_worker = False
+
+
+def _initialize_region_worker():
+    global _quiet_worker
+    progress.enabled = False
+    _quiet_worker = True
+
+
+def gap_progress_bar(description, total):
+    """
+    A tqdm progress bar over the gaps being filled or simplified, which is turned
+    off in worker processes.  (tqdm only reads its TQDM_* environment variables
+    when it is imported, so the workers can't turn it off that way.)
+    """
+    if _quiet_worker:
+        return tqdm(desc=description, total=total, disable=True)
+    return tqdm(desc=description, total=total)
 
 
 def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
@@ -756,19 +1234,18 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
     geometries0_df = geometries_df.copy()
 
     geometries_df = geometries_df.copy()
-    overlap_tower = [df.copy() for df in overlap_tower]
 
     geometries_df["geometry"] = Polygon()
 
-    max_overlap_level = len(overlap_tower)
+    max_overlap_level = overlap_tower.max_degree
 
-    # Start by assigning all order 1 pieces to the polygon they came from:
-    for ind in overlap_tower[0].index:
-        this_poly_ind = list(overlap_tower[0]["polygon indices"][ind])[0]
-        this_piece = overlap_tower[0]["geometry"][ind]
-        geometries_df.loc[this_poly_ind, "geometry"] = union_all(
-            [geometries_df.loc[this_poly_ind, "geometry"], this_piece]
-        )
+    # Start by assigning all order 1 pieces to the polygon they came from, with the
+    # unions for all of the polygons done together:
+    order_1_tower = overlap_tower.take(overlap_tower.level(1))
+    owners = geometries_df.index.get_indexer(
+        order_1_tower.polygons[order_1_tower.members]
+    )
+    add_pieces_to_geometries(geometries_df, order_1_tower.geometries, owners)
 
     # We will need to know which geometries were disconnected by removing
     # overlaps, so add columns for numbers of components in the original and refined
@@ -806,13 +1283,16 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
     orphaned_overlaps = []
 
     for i in range(1, max_overlap_level):
-        overlaps_df = overlap_tower[i]
-        overlaps_df_unused_indices = overlaps_df.index.tolist()
+        # The pieces of order i + 1, numbered 0, 1, 2, ... within this level, along
+        # with their numbers in the whole tower, which decide the order in which the
+        # disconnected geometries try to grab them:
+        overlap_pieces = overlap_tower.level(i + 1)
+        overlaps = overlap_tower.geometries[overlap_pieces]
+        overlap_numbers = overlap_tower.numbers[overlap_pieces]
+        index_of_number = dict(zip(overlap_numbers.tolist(), range(len(overlaps))))
+        overlaps_unused_indices = list(range(len(overlap_pieces)))
 
-        o_spatial_index = STRtree(overlaps_df["geometry"])
-        o_index_by_iloc = dict(
-            (i, list(overlaps_df.index)[i]) for i in range(len(overlaps_df))
-        )
+        o_spatial_index = STRtree(overlaps)
 
         for g_ind in geometries_disconnected_df.index:
             possible_overlap_integer_indices = list(
@@ -822,12 +1302,13 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
                     ).ravel()
                 )
             )
-            possible_overlap_indices_0 = [
-                o_index_by_iloc[k] for k in possible_overlap_integer_indices
+            possible_overlap_indices = [
+                index_of_number[number]
+                for number in set(
+                    overlap_numbers[possible_overlap_integer_indices].tolist()
+                )
+                & set(overlap_numbers[overlaps_unused_indices].tolist())
             ]
-            possible_overlap_indices = list(
-                set(possible_overlap_indices_0) & set(overlaps_df_unused_indices)
-            )
 
             geom_finished = False
 
@@ -836,26 +1317,26 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
                 # contained in it originally!), grab it.
                 if (
                     (geom_finished is False)
-                    and (g_ind in list(overlaps_df.loc[o_ind, "polygon indices"]))
+                    and (g_ind in overlap_tower.members_of(overlap_pieces[o_ind]))
                     and (
                         not geometries_disconnected_df.loc[g_ind, "geometry"]
-                        .intersection(overlaps_df.loc[o_ind, "geometry"])
+                        .intersection(overlaps[o_ind])
                         .is_empty
                     )
                 ):
 
                     if (
                         geometries_disconnected_df.loc[g_ind, "geometry"].intersection(
-                            overlaps_df.loc[o_ind, "geometry"]
+                            overlaps[o_ind]
                         )
                     ).length > 0:
                         geometries_disconnected_df.loc[g_ind, "geometry"] = union_all(
                             [
                                 geometries_disconnected_df.loc[g_ind, "geometry"],
-                                overlaps_df.loc[o_ind, "geometry"],
+                                overlaps[o_ind],
                             ]
                         )
-                        overlaps_df_unused_indices.remove(o_ind)
+                        overlaps_unused_indices.remove(o_ind)
                         if (
                             num_components(
                                 geometries_disconnected_df.loc[g_ind, "geometry"]
@@ -873,55 +1354,94 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
 
         # That's all we can do for the disconnected geometries at this level.
         # Go on to filling in the rest of the overlaps by greatest perimeter.
-        g_spatial_index = STRtree(geometries_df["geometry"])
-        g_index_by_iloc = dict(
-            (i, list(geometries_df.index)[i]) for i in range(len(geometries_df))
-        )
-
         if nested is False:
             print("Assigning order", i + 1, "pieces...")
 
-        for o_ind in overlaps_df_unused_indices:
-            this_overlap = overlaps_df.loc[o_ind, "geometry"]
-            shared_perimeters = []
-            possible_geom_integer_indices = list(
-                set(g_spatial_index.query(this_overlap).ravel())
+        # Each overlap goes to the polygon containing it that shares the most perimeter
+        # with it, taking the overlaps one at a time and comparing them with the
+        # polygons as they are when each overlap's turn comes, like so:
+        # (1) The candidates for each overlap are the polygons containing it whose
+        #     bounding boxes met it when this level began.
+        # (2) The winners are all computed at once against the polygons as they were
+        #     when this level began.
+        # (3) Going through the overlaps in order, an overlap's winner is recomputed
+        #     only if one of its candidates has been given an overlap touching it
+        #     since, which is the only way its shared perimeters can have changed.
+        # (4) The overlaps are added to their winners in turn, with the unions for
+        #     all the polygons done together, just before a polygon is needed again
+        #     (or at the end of the level).
+        # Overlaps that don't touch any of their candidates are orphaned, and tried
+        # again at the end.
+        geometries = numpy.array(geometries_df["geometry"].values, dtype="object")
+        current_geometries = geometries.copy()
+        g_spatial_index = STRtree(geometries)
+
+        unused = numpy.asarray(overlaps_unused_indices, dtype="int64")
+        unused_tower = overlap_tower.take(overlap_pieces[unused])
+        member_positions = geometries_df.index.get_indexer(
+            unused_tower.polygons[unused_tower.members]
+        )
+        hit_overlaps, hit_geometries = g_spatial_index.query(unused_tower.geometries)
+        hit_stops = numpy.searchsorted(hit_overlaps, numpy.arange(1, len(unused) + 1))
+        candidates = []
+        for k, hits in enumerate(numpy.split(hit_geometries, hit_stops[:-1])):
+            members = set(
+                member_positions[
+                    unused_tower.offsets[k] : unused_tower.offsets[k + 1]
+                ].tolist()
             )
-            possible_geom_indices = [
-                g_index_by_iloc[k] for k in possible_geom_integer_indices
-            ]
-
-            for g_ind in possible_geom_indices:
-                if (g_ind in list(overlaps_df.loc[o_ind, "polygon indices"])) and not (
-                    this_overlap.boundary
-                ).intersection(geometries_df.loc[g_ind, "geometry"].boundary).is_empty:
-                    shared_perimeters.append(
-                        (
-                            g_ind,
-                            (this_overlap.boundary)
-                            .intersection(geometries_df.loc[g_ind, "geometry"].boundary)
-                            .length,
-                        )
-                    )
-
-            if len(shared_perimeters) > 0:
-                max_shared_perim = sorted(shared_perimeters, key=lambda tup: tup[1])[-1]
-                poly_to_add_to = max_shared_perim[0]
-                geometries_df.loc[poly_to_add_to, "geometry"] = union_all(
-                    [geometries_df.loc[poly_to_add_to, "geometry"], this_overlap]
-                )
+            candidates.append([g for g in set(hits.tolist()) if g in members])
+        candidate_overlaps = numpy.repeat(
+            numpy.arange(len(unused)), [len(c) for c in candidates]
+        )
+        candidate_polygons = numpy.fromiter(
+            (g for c in candidates for g in c),
+            dtype="int64",
+            count=len(candidate_overlaps),
+        )
+        winners = largest_shared_perimeters(
+            unused_tower.geometries, geometries, candidate_overlaps, candidate_polygons
+        )
 
+        added = {}
+        pending = {}
+        for k, o_ind in enumerate(unused):
+            this_overlap = overlaps[o_ind]
+            changed = [
+                g
+                for g in candidates[k]
+                if g in added and shapely.intersects(added[g], this_overlap).any()
+            ]
+            if len(changed) > 0:
+                flush_pending_pieces(current_geometries, pending, candidates[k])
+                winners[k] = largest_shared_perimeters(
+                    numpy.array([this_overlap]),
+                    current_geometries,
+                    numpy.zeros(len(candidates[k]), dtype="int64"),
+                    numpy.asarray(candidates[k], dtype="int64"),
+                )[0]
+
+            winner = winners[k]
+            if winner >= 0:
+                added.setdefault(winner, []).append(this_overlap)
+                pending.setdefault(winner, []).append(this_overlap)
             else:
                 orphaned_overlaps.append(
-                    (
-                        overlaps_df.loc[o_ind, "geometry"],
-                        overlaps_df.loc[o_ind, "polygon indices"],
-                    )
+                    (this_overlap, overlap_tower.members_of(overlap_pieces[o_ind]))
                 )
+        flush_pending_pieces(current_geometries, pending, list(pending))
+        geometries_df["geometry"] = GeoSeries(
+            current_geometries, index=geometries_df.index, crs=geometries_df.crs
+        )
 
     # After completing the overlap tower, try again to assign any orphaned overlaps:
 
     if len(orphaned_overlaps) > 0:
+        g_spatial_index = STRtree(geometries_df["geometry"])
+        g_index_by_iloc = dict(
+            (i, list(geometries_df.index)[i]) for i in range(len(geometries_df))
+        )
+
         for o_ind in range(len(orphaned_overlaps)):
             this_overlap = orphaned_overlaps[o_ind][0]
             this_overlap_polygon_indices = orphaned_overlaps[o_ind][1]
@@ -934,7 +1454,7 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
             ]
 
             for g_ind in possible_geom_indices:
-                if (g_ind in list(this_overlap_polygon_indices)) and not (
+                if (g_ind in this_overlap_polygon_indices) and not (
                     this_overlap.boundary
                 ).intersection(geometries_df.loc[g_ind, "geometry"].boundary).is_empty:
                     shared_perimeters.append(
@@ -958,7 +1478,7 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
                 if nested is False:
                     print(
                         "Couldn't find a polygon to glue a component in the intersection of geometries",
-                        overlaps_df.loc[o_ind, "polygon indices"],
+                        this_overlap_polygon_indices,
                         "to",
                     )
 
@@ -969,6 +1489,78 @@ def reconstruct_from_overlap_tower(geometries_df, overlap_tower, nested=False):
     return reconstructed_df
 
 
+def add_pieces_to_geometries(geometries_df, pieces, owners):
+    """
+    Add each piece to the geometry at position owners[i] of geometries_df (see
+    add_pieces_in_turn).
+    """
+    geometries = numpy.array(geometries_df["geometry"].values, dtype="object")
+    add_pieces_in_turn(geometries, pieces, owners)
+    geometries_df["geometry"] = GeoSeries(
+        geometries, index=geometries_df.index, crs=geometries_df.crs
+    )
+
+
+def add_pieces_in_turn(geometries, pieces, owners):
+    """
+    Add each piece to geometries[owners[i]] (an array of geometries), one piece at a
+    time and in the order given for each geometry, just as a union_all with each
+    piece in turn would, but with the unions for all the geometries done in rounds
+    of one vectorized union_all.
+    """
+    order = numpy.argsort(owners, kind="stable")
+    sorted_owners = numpy.asarray(owners)[order]
+    turns = numpy.arange(len(order)) - numpy.searchsorted(sorted_owners, sorted_owners)
+    for turn in range(turns.max() + 1 if len(turns) > 0 else 0):
+        these_pieces = order[turns == turn]
+        these_owners = sorted_owners[turns == turn]
+        geometries[these_owners] = shapely.union_all(
+            numpy.stack([geometries[these_owners], pieces[these_pieces]], axis=1),
+            axis=1,
+        )
+
+
+def flush_pending_pieces(geometries, pending, positions):
+    """
+    Add the pieces pending[g] to geometries[g] (an array of geometries) in turn, for
+    each of the given positions g, and clear them from pending.
+    """
+    positions = [position for position in positions if position in pending]
+    if len(positions) == 0:
+        return
+    groups = [pending.pop(position) for position in positions]
+    add_pieces_in_turn(
+        geometries,
+        numpy.array([piece for group in groups for piece in group], dtype="object"),
+        numpy.repeat(positions, [len(group) for group in groups]),
+    )
+
+
+def largest_shared_perimeters(pieces, geometries, candidate_pieces, candidate_geoms):
+    """
+    For each piece, find the candidate geometry whose boundary shares the most
+    perimeter with the piece's boundary. The candidates are given as pairs of
+    positions (candidate_pieces[k], candidate_geoms[k]). Returns the position of
+    the winning geometry for each piece, or -1 if the piece's boundary does not
+    touch any of its candidates'.
+    """
+    shared = shapely.intersection(
+        shapely.boundary(pieces[candidate_pieces]),
+        shapely.boundary(geometries[candidate_geoms]),
+    )
+    touching = ~shapely.is_empty(shared)
+    candidate_pieces = candidate_pieces[touching]
+    candidate_geoms = candidate_geoms[touching]
+    lengths = shapely.length(shared[touching])
+
+    # Sort by piece and then by shared perimeter, so that the last candidate of each
+    # piece is the winner.
+    order = numpy.lexsort((lengths, candidate_pieces))
+    winners = numpy.full(len(pieces), -1)
+    winners[candidate_pieces[order]] = candidate_geoms[order]
+    return winners
+
+
 def drop_bad_holes(reconstructed_df, holes_df, fill_gaps_threshold):
     """Identify holes that won't be filled and drop them from holes_df"""
 
@@ -1029,7 +1621,7 @@ def drop_bad_holes(reconstructed_df, holes_df, fill_gaps_threshold):
     return holes_df, len(hole_indices_to_drop_nsc), len(hole_indices_to_drop_aat)
 
 
-def smart_close_gaps(geometries_df, holes_df):
+def smart_close_gaps(geometries_df, holes_df, n_jobs=None):
     """
     Fill simply connected gaps; general procedure is roughly as follows:
     (1) Fill in gaps that only intersect one non-exterior geometry in the
@@ -1047,12 +1639,22 @@ def smart_close_gaps(geometries_df, holes_df):
     (4) For any gap that intersects exactly 3 geometries (including exterior boundaries)
         nontrivially, fill by a process that gives a portion of the gap to each of
         the non-exterior geometries that it intersects.
+
+    If n_jobs asks for more than one worker process, the gaps are split into rounds
+    of gaps that don't touch any common geometry (see hole_conflict_classes), and
+    the gaps in each round are filled in parallel.
     """
+    if effective_n_jobs(n_jobs) > 1 and len(holes_df) > 1:
+        return close_gaps_in_rounds(geometries_df, holes_df, n_jobs)
+
     geometries_df = geometries_df.copy()
     holes_df = holes_df.copy()
+    segment_index = SegmentIndex(geometries_df["geometry"])
 
     # First step is to simplify gaps by convexifying the geometry boundaries:
-    geometries_df, holes_df = convexify_hole_boundaries(geometries_df, holes_df)
+    geometries_df, holes_df = convexify_hole_boundaries(
+        geometries_df, holes_df, segment_index=segment_index
+    )
 
     # Now proceed with filling simplified gaps.
     if len(holes_df) > 0:
@@ -1061,21 +1663,22 @@ def smart_close_gaps(geometries_df, holes_df):
             0
         ]  # All holes in this dataframe should be from the same region
         if this_region is None:
-            pbar = tqdm(desc="Gaps to fill", total=len(holes_to_process))
+            pbar = gap_progress_bar("Gaps to fill", len(holes_to_process))
         else:
-            pbar = tqdm(
-                desc=f"Gaps to fill in region {this_region}",
-                total=len(holes_to_process),
+            pbar = gap_progress_bar(
+                f"Gaps to fill in region {this_region}", len(holes_to_process)
             )
     else:
         holes_to_process = deque([])
-        pbar = tqdm(desc="Gaps to fill", total=len(holes_to_process))
+        pbar = gap_progress_bar("Gaps to fill", len(holes_to_process))
 
     while len(holes_to_process) > 0:
         pbar_increment = 1
         this_hole = holes_to_process.popleft()
         this_hole_df = GeoDataFrame(geometry=GeoSeries([this_hole]), crs=holes_df.crs)
-        this_hole_boundaries_df = construct_hole_boundaries(geometries_df, this_hole_df)
+        this_hole_boundaries_df = construct_hole_boundaries(
+            geometries_df, this_hole_df, segment_index
+        )
 
         # Break into cases depending on how many target geometries intersect this gap
         # and how many line segments the gap boundary consists of.
@@ -1139,7 +1742,7 @@ def smart_close_gaps(geometries_df, holes_df):
                 geometry=GeoSeries([this_hole]), crs=holes_df.crs
             )
             this_hole_boundaries_df = construct_hole_boundaries(
-                geometries_df, this_hole_df
+                geometries_df, this_hole_df, segment_index
             )
 
             # If this_hole falls into one of the simple cases above, put it back
@@ -1917,6 +2520,85 @@ def smart_close_gaps(geometries_df, holes_df):
     return geometries_df
 
 
+def hole_conflict_classes(geometries_df, holes_df):
+    """
+    Splits the positions of the holes into classes such that no two holes in the
+    same class touch a common geometry, so the holes in a class can be filled
+    independently of each other.  The classes are the color classes of a greedy
+    coloring of the conflict graph, in which two holes are joined if they touch a
+    common geometry; the holes with the most conflicts are colored first.
+    """
+    hole_positions, geom_positions = STRtree(geometries_df["geometry"]).query(
+        holes_df["geometry"], predicate="intersects"
+    )
+    holes_by_geom = [[] for _ in range(len(geometries_df))]
+    for h_pos, g_pos in zip(hole_positions.tolist(), geom_positions.tolist()):
+        holes_by_geom[g_pos].append(h_pos)
+
+    conflicts = [set() for _ in range(len(holes_df))]
+    for holes_of_this_geom in holes_by_geom:
+        for h_pos in holes_of_this_geom:
+            conflicts[h_pos].update(holes_of_this_geom)
+    for h_pos, conflicts_of_this_hole in enumerate(conflicts):
+        conflicts_of_this_hole.discard(h_pos)
+
+    colors = numpy.full(len(holes_df), -1)
+    for h_pos in sorted(
+        range(len(holes_df)), key=lambda h: len(conflicts[h]), reverse=True
+    ):
+        used = {colors[other] for other in conflicts[h_pos]}
+        colors[h_pos] = next(c for c in range(len(used) + 1) if c not in used)
+
+    return [numpy.flatnonzero(colors == c) for c in range(colors.max() + 1)]
+
+
+def close_gaps_in_rounds(geometries_df, holes_df, n_jobs):
+    """
+    Fill the holes like smart_close_gaps, one class of hole_conflict_classes at a
+    time, with the holes in each class filled in a pool of n_jobs worker processes.
+    Each worker only gets the holes it fills and the geometries they touch, and the
+    filled geometries are merged back in after each round.
+    """
+    geometries_df = geometries_df.copy()
+    n_jobs = effective_n_jobs(n_jobs)
+    geometry_column = geometries_df.columns.get_loc("geometry")
+
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_initialize_region_worker
+    ) as executor:
+        for hole_positions in hole_conflict_classes(geometries_df, holes_df):
+            round_holes_df = holes_df.iloc[hole_positions]
+            chunks = spatial_chunks(
+                numpy.asarray(round_holes_df["geometry"].values),
+                n_jobs * CHUNKS_PER_JOB,
+            )
+            tree = STRtree(geometries_df["geometry"])
+            futures = []
+            for chunk in chunks:
+                chunk_holes_df = round_holes_df.iloc[numpy.sort(chunk)]
+                _, geom_positions = tree.query(
+                    chunk_holes_df["geometry"], predicate="intersects"
+                )
+                futures.append(
+                    executor.submit(
+                        _close_gaps_of_holes,
+                        geometries_df.iloc[numpy.unique(geom_positions)],
+                        chunk_holes_df,
+                    )
+                )
+            for future in progress(as_completed(futures), len(futures)):
+                filled = future.result()
+                geometries_df.iloc[
+                    geometries_df.index.get_indexer(filled.index), geometry_column
+                ] = filled.values
+
+    return geometries_df
+
+
+def _close_gaps_of_holes(geometries_df, holes_df):
+    return smart_close_gaps(geometries_df, holes_df)["geometry"]
+
+
 def small_rook_to_queen(geometries_df, min_rook_length):
     """
     Convert all rook adjacencies between geometries with total adjacency length less
@@ -2155,111 +2837,140 @@ def small_rook_to_queen(geometries_df, min_rook_length):
     return geometries_df
 
 
-def construct_hole_boundaries(geometries_df, holes_df):
+def segment_key(start, end):
+    """
+    The key of the segment from start to end in a SegmentIndex: its endpoints, in
+    sorted order so that both orientations of the segment have the same key.
+    """
+    start, end = tuple(start[:2]), tuple(end[:2])
+    return start + end if start <= end else end + start
+
+
+def boundary_segment_keys(geometries):
+    """
+    The keys (see segment_key) of all the segments in the boundaries of the
+    polygonal geometries, with the position of the geometry each one belongs to.
+    """
+    owners, firsts, seconds = boundary_segment_endpoints(geometries)
+    keys = list(map(tuple, numpy.hstack([firsts, seconds]).tolist()))
+    return owners, keys
+
+
+class SegmentIndex:
+    """
+    A hash index from boundary segments (keyed on their endpoints, see segment_key)
+    to the labels of the geometries whose boundaries contain them, so that finding
+    the geometries that share each edge of a hole is a dictionary lookup. Since
+    smart_repair snaps the coordinates to a grid first, shared edges have identical
+    keys.
+
+    The index is built once per repair and updated one geometry at a time as the
+    geometries absorb pieces of holes. Gap filling only ever gives a piece of a hole
+    to one of the targets that construct_hole_boundaries found for it, and those are
+    exactly the labels owners_of returned. So the index remembers every label that
+    owners_of returns, and refresh re-indexes the ones whose geometry has since been
+    replaced. Any other geometry that is replaced has to be passed to update.
+    """
+
+    def __init__(self, geometries):
+        self.positions = {label: i for i, label in enumerate(geometries.index)}
+        self.indexed = dict(zip(geometries.index, geometries.values))
+        self.owners = {}
+        self.keys = {}
+        self.touched = set()
+
+        positions, keys = boundary_segment_keys(geometries.values)
+        for label, key in zip(geometries.index[positions], keys):
+            self.owners.setdefault(key, set()).add(label)
+            self.keys.setdefault(label, set()).add(key)
+
+    def owners_of(self, key):
+        """The labels of the geometries whose boundaries contain the segment."""
+        owners = self.owners.get(key, set())
+        self.touched.update(owners)
+        return owners
+
+    def position(self, label):
+        return self.positions.get(label, len(self.positions))
+
+    def update(self, label, geometry):
+        """Re-index the geometry with the given label."""
+        for key in self.keys.pop(label, set()):
+            owners = self.owners[key]
+            owners.discard(label)
+            if len(owners) == 0:
+                del self.owners[key]
+
+        self.indexed[label] = geometry
+        self.keys[label] = set(boundary_segment_keys([geometry])[1])
+        for key in self.keys[label]:
+            self.owners.setdefault(key, set()).add(label)
+
+    def refresh(self, geometries):
+        """
+        Re-index the geometries returned by owners_of since the last refresh that
+        have been replaced in geometries since they were indexed.
+        """
+        for label in self.touched:
+            geometry = geometries.at[label]
+            if geometry is not self.indexed.get(label):
+                self.update(label, geometry)
+        self.touched = set()
+
+
+def construct_hole_boundaries(geometries_df, holes_df, segment_index=None):
     """
     Construct a GeoDataFrame with all positive-length intersections between hole
     and geometry boundaries, including intersections between hole boundaries and
     exterior boundaries, if applicable.
-    """
-    geometries_df = geometries_df.copy()
-    holes_df = holes_df.copy()
 
-    # Be sure gaps are correctly oriented:
-    for h_ind in holes_df.index:
-        holes_df.loc[h_ind, "geometry"] = orient(holes_df.loc[h_ind, "geometry"])
+    If segment_index (a SegmentIndex of geometries_df["geometry"]) is given, it is
+    refreshed and used to look up the geometries along each hole; otherwise a new
+    one is built.
+    """
+    if segment_index is None:
+        segment_index = SegmentIndex(geometries_df["geometry"])
+    else:
+        segment_index.refresh(geometries_df["geometry"])
 
     # Do this WITHOUT using geometric intersection operations, which seem to be prone to
     # inexplicable rounding errors (GEOS bugs?)
-    # Start by constructing an STRtree to find geometries that may intersect gaps.
-
-    g_spatial_index = STRtree(geometries_df["geometry"])
-    g_index_by_iloc = dict(
-        (i, list(geometries_df.index)[i]) for i in range(len(geometries_df))
-    )
-
-    # Initialize the geodataframe for the gap boundaries
-    hole_boundaries_df = GeoDataFrame(
-        columns=["source", "target"], geometry=GeoSeries([]), crs=geometries_df.crs
+    # For each gap, look up the geometries that share each of its segments, and take
+    # the unary union of the segments shared with each geometry to construct the
+    # appropriate boundary between them.  (Note that this requires paying VERY careful
+    # attention to orientations!)
+    hole_boundaries = GeoDataFrameBuilder(
+        ["source", "target", "geometry"], geometries_df.crs
     )
-
-    # For each gap and each geometry that it might possibly intersect, find all
-    # common LineStrings in their boundaries (if any) and take their unary union to
-    # construct the appropriate boundary between them.  (Note that this requires paying
-    # VERY careful attention to orientations!)
-    for h_ind in holes_df.index:
-        this_hole = holes_df.loc[h_ind, "geometry"]
+    for h_ind, this_hole in zip(holes_df.index, holes_df["geometry"]):
+        # Be sure gaps are correctly oriented:
+        this_hole = orient(this_hole)
         this_hole_segments = segments(this_hole.boundary)
-        this_hole_segments_used = []
-
-        possible_geom_integer_indices = list(
-            set(g_spatial_index.query(holes_df.loc[h_ind, "geometry"]).ravel())
-        )
-        possible_geom_indices = [
-            g_index_by_iloc[k] for k in possible_geom_integer_indices
-        ]
-
-        for g_ind in possible_geom_indices:
-
-            this_geom = geometries_df.loc[g_ind, "geometry"]
-            if this_geom.geom_type == "Polygon":
-                this_geom_geoms = [orient(this_geom)]
-            elif this_geom.geom_type == "MultiPolygon":
-                this_geom_geoms = [orient(geom) for geom in this_geom.geoms]
-
-            this_geom_boundary_components = []
-            for geom in this_geom_geoms:
-                this_geom_boundary = geom.boundary
-                if this_geom_boundary.geom_type == "LineString":
-                    this_geom_boundary_components += [this_geom_boundary]
-                elif this_geom_boundary.geom_type == "MultiLineString":
-                    this_geom_boundary_components += list(this_geom_boundary.geoms)
-
-            this_geom_segments = set()
-            for component in this_geom_boundary_components:
-                this_geom_segments = this_geom_segments.union(set(segments(component)))
-
-            this_hole_this_geom_segments = [
-                segment
-                for segment in this_hole_segments
-                if (
-                    segment in this_geom_segments
-                    or shapely.reverse(segment) in this_geom_segments
-                )
-            ]
-
-            if len(this_hole_this_geom_segments) > 0:
 
-                this_hole_segments_used += this_hole_this_geom_segments
-                this_hole_boundary_df = GeoDataFrame(
-                    geometry=GeoSeries([linemerge(this_hole_this_geom_segments)]),
-                    crs=geometries_df.crs,
-                )
-                this_hole_boundary_df.insert(0, "source", h_ind)
-                this_hole_boundary_df.insert(1, "target", g_ind)
-
-                hole_boundaries_df = pandas.concat(
-                    [hole_boundaries_df, this_hole_boundary_df]
-                ).reset_index(drop=True)
+        segments_by_geom = {}
+        exterior_segments = []
+        for segment in this_hole_segments:
+            owners = segment_index.owners_of(segment_key(*segment.coords))
+            if len(owners) == 0:
+                exterior_segments.append(segment)
+            for g_ind in owners:
+                segments_by_geom.setdefault(g_ind, []).append(segment)
+
+        for g_ind in sorted(segments_by_geom, key=segment_index.position):
+            hole_boundaries.append(
+                source=h_ind,
+                target=g_ind,
+                geometry=linemerge(segments_by_geom[g_ind]),
+            )
 
         # Finally, check for any exterior boundary:
-        if len(this_hole_segments) > len(this_hole_segments_used):
-            exterior_segments = [
-                segment
-                for segment in this_hole_segments
-                if segment not in this_hole_segments_used
-            ]
-            this_hole_exterior_boundary_df = GeoDataFrame(
-                geometry=GeoSeries([linemerge(exterior_segments)]),
-                crs=geometries_df.crs,
+        if len(exterior_segments) > 0:
+            hole_boundaries.append(
+                source=h_ind, target=-1, geometry=linemerge(exterior_segments)
             )
-            this_hole_exterior_boundary_df.insert(0, "source", h_ind)
-            this_hole_exterior_boundary_df.insert(1, "target", -1)
-            hole_boundaries_df = pandas.concat(
-                [hole_boundaries_df, this_hole_exterior_boundary_df]
-            ).reset_index(drop=True)
 
-    hole_boundaries_df = hole_boundaries_df.explode(index_parts=False).reset_index(
-        drop=True
+    hole_boundaries_df = (
+        hole_boundaries.finalize().explode(index_parts=False).reset_index(drop=True)
     )
 
     return hole_boundaries_df
@@ -2310,9 +3021,34 @@ def incenter(triangle):
 
 
 def triangulate_polygon(polygon):
+    """
+    Triangulate a not-necessarily-convex simple polygon, using only its own vertices.
+
+    The triangulation is GEOS's constrained Delaunay triangulation, which takes
+    O(n log n) time in the number of vertices.  If it doesn't come out as exactly
+    n - 2 triangles covering the polygon (which can happen for degenerate inputs,
+    such as polygons with repeated or collinear vertices), the polygon is
+    triangulated by ear clipping instead.
+    """
+    try:
+        triangles = shapely.get_parts(shapely.constrained_delaunay_triangles(polygon))
+    except shapely.errors.GEOSException:
+        return ear_clipping_triangulation(polygon)
+
+    num_vertices = len(polygon.exterior.coords) - 1
+    if (
+        len(triangles) == num_vertices - 2
+        and abs(shapely.area(triangles).sum() - polygon.area) <= 1e-9 * polygon.area
+    ):
+        return list(triangles)
+    return ear_clipping_triangulation(polygon)
+
+
+def ear_clipping_triangulation(polygon):
     """
     Triangulate a not-necessarily-convex simple polygon, based on the ear clipping
-    method.
+    method.  This takes roughly cubic time in the number of vertices, so it is only
+    used when triangulate_polygon can't use the constrained Delaunay triangulation.
     """
 
     triangles = []
@@ -2380,222 +3116,178 @@ def shortest_path_in_polygon(polygon, start, end, full_triangulation=None):
         return [start, end]
 
     else:
-        # First make sure the polygon is oriented so that we're clear on what
-        # "left" and "right" mean.
-        polygon = orient(polygon)
-
-        # Create two paths around polygon.boundary to the start and end points, oriented
-        # appropriately.
-        boundary_points = list(extract_unique_points(polygon.boundary).geoms)
-        start_index = boundary_points.index(start)
-        end_index = boundary_points.index(end)
-        if start_index < end_index:
-            path_1 = LineString(boundary_points[start_index : end_index + 1])
-            path_2 = LineString(
-                boundary_points[end_index:] + boundary_points[0 : start_index + 1]
-            )
-        else:
-            path_1 = LineString(
-                boundary_points[start_index:] + boundary_points[0 : end_index + 1]
-            )
-            path_2 = LineString(boundary_points[end_index : start_index + 1])
-
-        if (extract_unique_points(path_1).geoms[0] == start) and (
-            extract_unique_points(path_2).geoms[0] == end
-        ):
-            right_path = path_1
-            left_path = shapely.reverse(path_2)
-
-        elif (extract_unique_points(path_2).geoms[0] == start) and (
-            extract_unique_points(path_1).geoms[0] == end
-        ):
-            right_path = path_2
-            left_path = shapely.reverse(path_1)
-
-        right_path_points = list(extract_unique_points(right_path).geoms)
-        left_path_points = list(extract_unique_points(left_path).geoms)
-
-        # Now triangulate the polygon, but only keep the triangles that have one vertex
-        # in each of the right and left paths (not counting the starting and ending points)
-        # in order to create a "sleeve" for the shortest path.
+        # Work with the vertices as an array, and with each triangle of the
+        # triangulation as the positions of its 3 vertices in that array.
+        vertices = shapely.get_coordinates(polygon.exterior)[:-1]
+        vertex_positions = {
+            vertex: i for i, vertex in enumerate(map(tuple, vertices.tolist()))
+        }
         if full_triangulation is None:
             full_triangulation = triangulate_polygon(polygon)
-
-        triangulation = []
-        for triangle in full_triangulation:
-            if (
-                not triangle.boundary.intersection(
-                    MultiPoint(right_path_points[1:-1])
-                ).is_empty
-                and not triangle.boundary.intersection(
-                    MultiPoint(left_path_points[1:-1])
-                ).is_empty
-            ):
-                triangulation.append(triangle)
-
-        # Put the triangles for the sleeve in the correct order:
-        initial_triangle = [
-            triangle
-            for triangle in triangulation
-            if start in extract_unique_points(triangle.boundary).geoms
-        ][0]
-
-        ordered_triangulation = [initial_triangle]
-        triangulation.remove(initial_triangle)
-
-        while len(triangulation) > 0:
-            leading_triangle = ordered_triangulation[-1]
-            next_triangle = [
-                triangle
-                for triangle in triangulation
-                if leading_triangle.intersection(triangle).geom_type == "LineString"
-            ][0]
-            ordered_triangulation.append(next_triangle)
-            triangulation.remove(next_triangle)
-
-        # Regard the sleeve given by the union of these triangles as the "simplified"
-        # polygon; the shortest path must be contained in this simplfied polygon.
-        polygon_simplified = union_all(ordered_triangulation)
-
-        # Now use the ordered triangulation to order the vertices of the simplified polygon,
-        # as well as the left and right paths restricted to the simplified polygon.
-        ordered_path_vertices = [start]
-        right_path_simplified_points = [start]
-        left_path_simplified_points = [start]
-
-        for triangle in ordered_triangulation:
-            this_triangle_vertices = set(extract_unique_points(triangle.boundary).geoms)
-            this_triangle_new_vertices = this_triangle_vertices.difference(
-                set(ordered_path_vertices)
-            )
-            ordered_path_vertices = ordered_path_vertices + list(
-                this_triangle_new_vertices
-            )
-            for vertex in this_triangle_new_vertices:
-                if vertex in right_path_points:
-                    right_path_simplified_points.append(vertex)
-                if vertex in left_path_points:
-                    left_path_simplified_points.append(vertex)
-
-        # Initialize the found_shortest_path and the left and right funnel edges:
-        found_shortest_path = [start]
-
-        left_funnel = [left_path_simplified_points[0], left_path_simplified_points[1]]
-        right_funnel = [
-            right_path_simplified_points[0],
-            right_path_simplified_points[1],
-        ]
-
-        # We've already used the first 3 points on this list, so take them out.
-        ordered_path_vertices = ordered_path_vertices[3:]
-
-        # Now find the shortest path!
-        for point in ordered_path_vertices:
-            apex = found_shortest_path[-1]
-
-            if point in left_path_simplified_points:
-                this_funnel = left_funnel
-                other_funnel = right_funnel
-                reflex_sign = 1
-            elif point in right_path_simplified_points:
-                this_funnel = right_funnel
-                other_funnel = left_funnel
-                reflex_sign = -1
-
-            # Start by checking whether this point can see the apex, and if so, the
-            # apex becomes the new predecessor on this funnel.
-            # Otherwise, find the first point on this funnel that can see point,
-            # and check whether this is a *reflex* vertex.  If so, cut off the rest
-            # of this funnel and add point to it.  If not, find the first seen
-            # vertex on the *other* funnel; it's guaranteed to be reflex.  Make it
-            # the new apex, and add the other funnel up to this point to
-            # found_shortest_path.
-
-            if polygon_simplified.contains(
-                LineString([apex, point])
-            ) or polygon_simplified.boundary.contains(LineString([apex, point])):
-                new_funnel_points = [apex]
-                for i in range(1, len(this_funnel)):
-                    if LineString([apex, point]).contains(
-                        LineString([this_funnel[i], point])
-                    ):
-                        new_funnel_points.append(this_funnel[i])
-                this_funnel = new_funnel_points + [point]
-
-            else:
-                for i in range(1, len(this_funnel)):
-                    if polygon_simplified.contains(
-                        LineString([this_funnel[i], point])
-                    ) or polygon_simplified.boundary.contains(
-                        LineString([this_funnel[i], point])
-                    ):
-                        first_seen = i
-                        break
-
-                seg1 = list(
-                    LineString(
-                        [this_funnel[first_seen - 1], this_funnel[first_seen]]
-                    ).coords
+        triangles = numpy.asarray(full_triangulation, dtype="object")
+        triangle_coords = shapely.get_coordinates(triangles)
+        num_coords = shapely.get_num_coordinates(triangles)
+        first_coords = numpy.cumsum(num_coords) - num_coords
+        triangle_vertices = numpy.array(
+            [
+                vertex_positions[vertex]
+                for vertex in map(
+                    tuple,
+                    triangle_coords[first_coords[:, None] + numpy.arange(3)]
+                    .reshape(-1, 2)
+                    .tolist(),
                 )
-                seg2 = list(LineString([this_funnel[first_seen], point]).coords)
+            ]
+        ).reshape(-1, 3)
+
+        start_position = vertex_positions[(start.x, start.y)]
+        end_position = vertex_positions[(end.x, end.y)]
+        path = funnel_path(
+            vertices,
+            triangle_vertices,
+            sleeve(triangle_vertices, start_position, end_position),
+            start_position,
+            end_position,
+        )
+        return [Point(vertices[i]) for i in path]
 
-                vec1 = (seg1[1][0] - seg1[0][0], seg1[1][1] - seg1[0][1])
-                vec2 = (seg2[1][0] - seg2[0][0], seg2[1][1] - seg2[0][1])
 
-                cross_prod = vec1[0] * vec2[1] - vec1[1] * vec2[0]
+def orientation(o, a, b):
+    """
+    Twice the signed area of the triangle (o, a, b): positive if b is to the left of
+    the ray from o through a, negative if it is to the right and 0 if it is on it.
+    """
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
 
-                if cross_prod * reflex_sign >= 0:
-                    # If this vertex is reflex:
-                    new_funnel_points = this_funnel[0 : first_seen + 1]
-                    for i in range(first_seen + 1, len(this_funnel)):
-                        if LineString([this_funnel[first_seen], point]).contains(
-                            LineString([this_funnel[i], point])
-                        ):
-                            new_funnel_points.append(this_funnel[i])
-                    this_funnel = new_funnel_points + [point]
 
-                else:
-                    first_seen = min(
-                        i
-                        for i in range(1, len(other_funnel))
-                        if polygon_simplified.contains(
-                            LineString([other_funnel[i], point])
-                        )
-                        or polygon_simplified.boundary.contains(
-                            LineString([other_funnel[i], point])
-                        )
-                    )
-                    found_shortest_path += other_funnel[1 : first_seen + 1]
-                    apex = other_funnel[first_seen]
-                    # new_funnel_points = [apex]
-                    other_funnel_start_index = first_seen
-                    for i in range(first_seen + 1, len(other_funnel)):
-                        if LineString([apex, point]).contains(
-                            LineString([other_funnel[i], point])
-                        ):
-                            found_shortest_path.append(other_funnel[i])
-                            apex = other_funnel[i]
-                            other_funnel_start_index = i
+def sleeve(triangles, start, end):
+    """
+    The positions (in triangles, an array of vertex positions) of the triangles on
+    the path from a triangle with the vertex start to a triangle with the vertex
+    end in the dual tree of the triangulation, in order.  Only the first triangle
+    has start as a vertex and only the last one has end as a vertex.
+    """
+    # Two triangles are adjacent in the dual tree if they share an edge:
+    edges = numpy.sort(triangles[:, [[0, 1], [1, 2], [2, 0]]].reshape(-1, 2), axis=1)
+    edge_triangles = numpy.repeat(numpy.arange(len(triangles)), 3)
+    order = numpy.lexsort((edges[:, 1], edges[:, 0]))
+    edges, edge_triangles = edges[order], edge_triangles[order]
+    shared = numpy.flatnonzero((edges[1:] == edges[:-1]).all(axis=1))
+    neighbors = [[] for _ in range(len(triangles))]
+    for first, second in zip(edge_triangles[shared], edge_triangles[shared + 1]):
+        neighbors[first].append(second)
+        neighbors[second].append(first)
+
+    # Breadth-first search from all the triangles around start at once:
+    ends = set(numpy.flatnonzero((triangles == end).any(axis=1)).tolist())
+    starts = numpy.flatnonzero((triangles == start).any(axis=1)).tolist()
+    previous = dict.fromkeys(starts, -1)
+    queue = deque(starts)
+    while len(queue) > 0:
+        triangle = queue.popleft()
+        if triangle in ends:
+            break
+        for neighbor in neighbors[triangle]:
+            if neighbor not in previous:
+                previous[neighbor] = triangle
+                queue.append(neighbor)
+    else:
+        raise ValueError("The triangulation does not connect start and end.")
 
-                    this_funnel = [apex, point]
-                    other_funnel = other_funnel[other_funnel_start_index:]
+    path = [triangle]
+    while previous[path[-1]] != -1:
+        path.append(previous[path[-1]])
+    return path[::-1]
 
-            # Reassign this_funnel and other_funnel to left_funnel and right_funnel:
-            if point in left_path_simplified_points:
-                left_funnel = this_funnel
-                right_funnel = other_funnel
-            elif point in right_path_simplified_points:
-                right_funnel = this_funnel
-                left_funnel = other_funnel
 
-        # Still need to complete the path by adding the portion from the current apex to
-        # the endpoint:
-        found_shortest_path += left_funnel[1:]
+def funnel_path(vertices, triangles, sleeve, start, end):
+    """
+    The positions of the vertices on the shortest path from start to end through
+    the sleeve of triangles (see sleeve), found with the funnel algorithm using only
+    orientation tests.  Vertices of the sleeve that the path passes straight through
+    are included.
+    """
+    points = list(map(tuple, vertices.tolist()))
+
+    # The portals are the edges shared by consecutive triangles of the sleeve, as
+    # (left, right) pairs when looking from the start towards the end.
+    portals = [(start, start)]
+    for current, following in zip(sleeve[:-1], sleeve[1:]):
+        a, b = numpy.intersect1d(triangles[current], triangles[following]).tolist()
+        [c] = set(triangles[current].tolist()) - {a, b}
+        if orientation(points[c], points[a], points[b]) > 0:
+            portals.append((b, a))
+        else:
+            portals.append((a, b))
+    portals.append((end, end))
 
-        return found_shortest_path
+    path = [start]
+    apex = left = right = start
+    apex_index = left_index = right_index = 0
+    i = 1
+    while i < len(portals):
+        new_left, new_right = portals[i]
+
+        if orientation(points[apex], points[right], points[new_right]) >= 0:
+            if (
+                apex == right
+                or orientation(points[apex], points[left], points[new_right]) < 0
+            ):
+                # Tighten the funnel.
+                right, right_index = new_right, i
+            else:
+                # The right side crosses over the left, so the left point is on the
+                # path.  Restart from there.
+                if left != path[-1]:
+                    path.append(left)
+                apex, apex_index = left, left_index
+                right, right_index = apex, apex_index
+                i = apex_index + 1
+                continue
+
+        if orientation(points[apex], points[left], points[new_left]) <= 0:
+            if (
+                apex == left
+                or orientation(points[apex], points[right], points[new_left]) > 0
+            ):
+                # Tighten the funnel.
+                left, left_index = new_left, i
+            else:
+                # The left side crosses over the right, so the right point is on the
+                # path.  Restart from there.
+                if right != path[-1]:
+                    path.append(right)
+                apex, apex_index = right, right_index
+                left, left_index = apex, apex_index
+                i = apex_index + 1
+                continue
+
+        i += 1
+
+    if path[-1] != end:
+        path.append(end)
+
+    # Add the vertices of the sleeve that lie on the path between its turns:
+    sleeve_vertices = numpy.unique(triangles[sleeve])
+    full_path = [path[0]]
+    for p, q in zip(path[:-1], path[1:]):
+        direction = vertices[q] - vertices[p]
+        offsets = vertices[sleeve_vertices] - vertices[p]
+        along = offsets @ direction
+        on_segment = (
+            (offsets[:, 0] * direction[1] - offsets[:, 1] * direction[0] == 0)
+            & (along > 0)
+            & (along < direction @ direction)
+            & (sleeve_vertices != p)
+            & (sleeve_vertices != q)
+        )
+        between = sleeve_vertices[on_segment]
+        full_path += between[numpy.argsort(along[on_segment])].tolist()
+        full_path.append(q)
+    return full_path
 
 
-def convexify_hole_boundaries(geometries_df, holes_df):
+def convexify_hole_boundaries(geometries_df, holes_df, segment_index=None):
     """
     Partially fill gaps as follows:
     (1) Assign any gap that only adjoins 1 geometry to that geometry.
@@ -2607,13 +3299,16 @@ def convexify_hole_boundaries(geometries_df, holes_df):
     the gap, this will fill the gap completely; otherwise it will usually leave one or
     more smaller gaps remaining.  The convexity of the geometry boundaries will simplify
     the process of filling the remaining gap(s).
+
+    The geometries along each gap are looked up in segment_index (a SegmentIndex of
+    geometries_df["geometry"]), which is built here if it isn't given.
     """
     geometries_df = geometries_df.copy()
     holes_df = holes_df.copy()
+    if segment_index is None:
+        segment_index = SegmentIndex(geometries_df["geometry"])
 
-    completed_holes_df = GeoDataFrame(
-        columns=["region"], geometry=GeoSeries([]), crs=holes_df.crs
-    )
+    completed_holes = GeoDataFrameBuilder(["region", "geometry"], holes_df.crs)
 
     if len(holes_df) > 0:
         holes_to_process = deque(list(holes_df["geometry"]))
@@ -2621,21 +3316,22 @@ def convexify_hole_boundaries(geometries_df, holes_df):
             0
         ]  # All holes in this dataframe should be from the same region
         if this_region is None:
-            pbar = tqdm(desc="Gaps to simplify", total=len(holes_to_process))
+            pbar = gap_progress_bar("Gaps to simplify", len(holes_to_process))
         else:
-            pbar = tqdm(
-                desc=f"Gaps to simplify in region {this_region}",
-                total=len(holes_to_process),
+            pbar = gap_progress_bar(
+                f"Gaps to simplify in region {this_region}", len(holes_to_process)
             )
     else:
         holes_to_process = deque([])
-        pbar = tqdm(desc="Gaps to simplify", total=len(holes_to_process))
+        pbar = gap_progress_bar("Gaps to simplify", len(holes_to_process))
 
     while len(holes_to_process) > 0:
         pbar_increment = 1
         this_hole = holes_to_process.popleft()
         this_hole_df = GeoDataFrame(geometry=GeoSeries([this_hole]), crs=holes_df.crs)
-        this_hole_boundaries_df = construct_hole_boundaries(geometries_df, this_hole_df)
+        this_hole_boundaries_df = construct_hole_boundaries(
+            geometries_df, this_hole_df, segment_index
+        )
 
         # Take care of some trivial cases:
         if len(set(this_hole_boundaries_df["target"]).difference({-1})) == 0:
@@ -2743,10 +3439,6 @@ def convexify_hole_boundaries(geometries_df, holes_df):
 
                 for new_hole in new_holes:
                     new_hole = orient(new_hole)
-                    new_hole_df = GeoDataFrame(
-                        geometry=GeoSeries([new_hole]), crs=holes_df.crs
-                    )
-                    new_hole_df.insert(0, "region", this_region)
 
                     if target_repetition:
                         # Check to see whether the target that was repeated in the original
@@ -2755,8 +3447,13 @@ def convexify_hole_boundaries(geometries_df, holes_df):
                         # may have been concatenated after convexifying, resulting in a
                         # non-convex boundary - so put the hole back in the queue for
                         # another round of processing.
+                        new_hole_df = GeoDataFrame(
+                            {"region": [this_region]},
+                            geometry=GeoSeries([new_hole]),
+                            crs=holes_df.crs,
+                        )
                         new_hole_boundaries_df = construct_hole_boundaries(
-                            geometries_df, new_hole_df
+                            geometries_df, new_hole_df, segment_index
                         )
                         reprocess_hole = False
                         for target in repeated_targets:
@@ -2772,16 +3469,14 @@ def convexify_hole_boundaries(geometries_df, holes_df):
                         if reprocess_hole:
                             holes_to_process.append(new_hole)
                         else:
-                            completed_holes_df = pandas.concat(
-                                [completed_holes_df, new_hole_df]
-                            ).reset_index(drop=True)
+                            completed_holes.append(
+                                region=this_region, geometry=new_hole
+                            )
                     else:
-                        completed_holes_df = pandas.concat(
-                            [completed_holes_df, new_hole_df]
-                        ).reset_index(drop=True)
+                        completed_holes.append(region=this_region, geometry=new_hole)
 
         pbar.update(pbar_increment)
 
     pbar.close()
 
-    return geometries_df, completed_holes_df
+    return geometries_df, completed_holes.finalize()
@@ -0,0 +1,128 @@
+import numpy
+import pandas
+from pandas.api.types import is_numeric_dtype
+
+
+class WeightMatrix:
+    """A sparse matrix of weights from a set of source units to a set of target
+    units, stored in coordinate (COO) form as three parallel arrays: the integer
+    position of each entry's source, the integer position of its target, and its
+    weight.
+
+    Multiplying the matrix by a table of source data (see :meth:`prorate`) moves
+    every column of the table to the targets at once, with a single pass over the
+    nonzero entries.
+
+    :param source_positions: positions (into ``sources``) of each entry's source
+    :param target_positions: positions (into ``targets``) of each entry's target
+    :param weights: the weight of each entry
+    :param sources: the labels of the source units
+    :type sources: :class:`pandas.Index`
+    :param targets: the labels of the target units
+    :type targets: :class:`pandas.Index`
+    """
+
+    def __init__(self, source_positions, target_positions, weights, sources, targets):
+        self.source_positions = numpy.asarray(source_positions, dtype="int64")
+        self.target_positions = numpy.asarray(target_positions, dtype="int64")
+        self.weights = numpy.asarray(weights, dtype="float")
+        self.sources = pandas.Index(sources)
+        self.targets = pandas.Index(targets)
+
+    @classmethod
+    def from_series(cls, weights, source_level="source", target_level="target"):
+        """Builds a WeightMatrix from a Series of weights with a MultiIndex, like
+        the output of :func:`~maup.intersections`. Entries whose source or target
+        label is missing are dropped.
+        """
+        source_positions, sources = _factorize_level(weights.index, source_level)
+        target_positions, targets = _factorize_level(weights.index, target_level)
+        keep = (source_positions >= 0) & (target_positions >= 0)
+        return cls(
+            source_positions[keep],
+            target_positions[keep],
+            weights.to_numpy(dtype="float")[keep],
+            sources,
+            targets,
+        )
+
+    @property
+    def shape(self):
+        return (len(self.targets), len(self.sources))
+
+    def __len__(self):
+        return len(self.weights)
+
+    def normalize(self, by="source"):
+        """Returns a new WeightMatrix whose weights are scaled so that they sum to
+        one over each source (``by="source"``) or each target (``by="target"``).
+        Weights of units whose weights sum to zero are set to zero.
+        """
+        if by == "source":
+            positions, size = self.source_positions, len(self.sources)
+        elif by == "target":
+            positions, size = self.target_positions, len(self.targets)
+        else:
+            raise ValueError('by must be "source" or "target"')
+
+        return WeightMatrix(
+            self.source_positions,
+            self.target_positions,
+            scale_to_unit_sums(self.weights, positions, size),
+            self.sources,
+            self.targets,
+        )
+
+    def prorate(self, data):
+        """Multiplies the matrix by ``data`` (a Series or DataFrame indexed by the
+        source labels), summing the weighted source values into each target. The
+        result is indexed by the target labels. Missing values contribute nothing.
+        """
+        if isinstance(data, pandas.DataFrame):
+            values = data.reindex(self.sources).to_numpy(dtype="float")
+        elif isinstance(data, pandas.Series):
+            values = data.reindex(self.sources).to_numpy(dtype="float")[:, None]
+        else:
+            raise TypeError("Data must be a Series or DataFrame")
+
+        num_columns = values.shape[1]
+        contributions = values[self.source_positions] * self.weights[:, None]
+        contributions[numpy.isnan(contributions)] = 0
+
+        # Sum every column at once by offsetting each column's bins.
+        bins = self.target_positions[:, None] * num_columns + numpy.arange(num_columns)
+        totals = numpy.bincount(
+            bins.ravel(),
+            weights=contributions.ravel(),
+            minlength=len(self.targets) * num_columns,
+        ).reshape(len(self.targets), num_columns)
+
+        if isinstance(data, pandas.DataFrame):
+            return pandas.DataFrame(totals, index=self.targets, columns=data.columns)
+        return pandas.Series(totals[:, 0], index=self.targets)
+
+
+def scale_to_unit_sums(weights, positions, size):
+    """Divides each weight by the sum of the weights that share its position,
+    treating missing weights as zero."""
+    totals = numpy.bincount(
+        positions, weights=numpy.nan_to_num(weights, nan=0.0), minlength=size
+    )
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        scaled = weights / totals[positions]
+    scaled[numpy.isnan(scaled)] = 0
+    return scaled
+
+
+def can_prorate_with_matrix(data):
+    """Whether every column of ``data`` is numeric, so that it can be moved with a
+    :class:`WeightMatrix` instead of a column-by-column groupby."""
+    if isinstance(data, pandas.DataFrame):
+        return all(is_numeric_dtype(dtype) for dtype in data.dtypes)
+    return isinstance(data, pandas.Series) and is_numeric_dtype(data.dtype)
+
+
+def _factorize_level(index, level):
+    labels = index.get_level_values(level)
+    positions, uniques = pandas.factorize(labels, sort=True)
+    return positions, pandas.Index(uniques, name=labels.name)
@@ -1,8 +1,17 @@
 import pytest
+import shapely
 
+from geopandas import GeoSeries
+from shapely.geometry import LineString, Polygon
 from shapely.geometry.base import BaseGeometry
 
-from maup.adjacencies import adjacencies, OverlapWarning, IslandWarning
+from maup.adjacencies import (
+    adjacencies,
+    boundary_segments,
+    OverlapWarning,
+    IslandWarning,
+)
+from maup.repair import snap_to_grid
 
 
 class TestAdjacencies:
@@ -38,3 +47,92 @@ class TestAdjacencies:
 
         adjs = adjacencies(four_square_grid)
         assert adjs.crs == four_square_grid.crs
+
+    def test_n_jobs_gives_the_same_adjacencies(self, four_square_grid):
+        expected = adjacencies(four_square_grid, "queen").sort_index()
+        result = adjacencies(four_square_grid, "queen", n_jobs=2).sort_index()
+
+        assert list(result.index) == list(expected.index)
+        assert result.geom_equals_exact(expected, tolerance=0).all()
+
+    def test_matches_pairwise_intersections(self, squares_some_neat_some_overlapping):
+        geometries = squares_some_neat_some_overlapping.geometry
+        expected = {
+            (i, j): geometries[i].intersection(geometries[j])
+            for i in geometries.index
+            for j in geometries.index
+            if i < j and geometries[i].intersects(geometries[j])
+        }
+
+        adjs = adjacencies(geometries, "queen", warn_for_overlaps=False)
+
+        assert list(adjs.index) == sorted(expected)
+        for pair, inter in adjs.items():
+            assert inter.equals(expected[pair])
+
+    def test_edges_output_gives_shared_lengths(self, four_square_grid):
+        expected = adjacencies(four_square_grid).length.sort_index()
+        edges = adjacencies(four_square_grid, output_type="edges")
+
+        assert not isinstance(edges, GeoSeries)
+        assert list(edges.index) == list(expected.index)
+        assert (edges == expected).all()
+
+    def test_queen_edges_include_corners(self, four_square_grid):
+        edges = adjacencies(four_square_grid, "queen", output_type="edges")
+        assert set(edges.index) == {(0, 1), (1, 3), (2, 3), (0, 2), (1, 2), (0, 3)}
+        assert edges[(1, 2)] == 0 and edges[(0, 3)] == 0
+
+    def test_edges_output_warns_for_overlaps(self, squares_some_neat_some_overlapping):
+        with pytest.warns(OverlapWarning):
+            adjacencies(squares_some_neat_some_overlapping, output_type="edges")
+
+    @pytest.mark.parametrize("adjacency_type", ["rook", "queen"])
+    def test_arcs_method_matches_intersections(self, four_square_grid, adjacency_type):
+        expected = adjacencies(four_square_grid, adjacency_type).sort_index()
+        result = adjacencies(four_square_grid, adjacency_type, method="arcs")
+
+        assert list(result.index) == list(expected.index)
+        assert result.geom_equals(expected).all()
+
+    def test_arcs_method_gives_shared_lengths(self, four_square_grid):
+        expected = adjacencies(four_square_grid, "queen", output_type="edges")
+        result = adjacencies(
+            four_square_grid, "queen", output_type="edges", method="arcs"
+        )
+        assert (result == expected).all()
+
+    def test_arcs_method_can_snap_vertices(self, four_square_grid):
+        # Move the corners that b shares with a and d by a tiny amount, so that
+        # its segments no longer match theirs exactly.
+        nudged = four_square_grid.copy()
+        nudged.loc[1, "geometry"] = Polygon(
+            [(0, 1 + 1e-12), (0, 2), (1 - 1e-12, 2), (1, 1 + 1e-12)]
+        )
+        unsnapped = adjacencies(nudged, method="arcs", warn_for_islands=False)
+        assert set(unsnapped.index) == {(0, 2), (2, 3)}
+
+        result = adjacencies(nudged, method="arcs", snap_magnitude=-6)
+        assert set(result.index) == {(0, 1), (1, 3), (2, 3), (0, 2)}
+        assert result[(0, 1)].equals(LineString([(0, 1), (1, 1)]))
+
+    def test_arcs_method_snaps_like_snap_to_grid(self):
+        # Scaling 4.445 by 100 and rounding gives 444, but round(4.445, 2) is 4.45.
+        geometries = GeoSeries([Polygon([(0, 0), (4.445, 0), (4.445, 1), (0, 1)])])
+        segments = boundary_segments(geometries, snap_magnitude=-2)
+        snapped = shapely.get_coordinates(snap_to_grid(geometries, n=-2))
+
+        assert set(segments["x0"]) | set(segments["x1"]) == set(snapped[:, 0])
+        assert 4.45 in set(segments["x1"])
+
+    def test_arcs_method_raises_for_n_jobs(self, four_square_grid):
+        with pytest.raises(ValueError):
+            adjacencies(four_square_grid, method="arcs", n_jobs=2)
+
+    def test_raises_for_snap_magnitude_without_arcs(self, four_square_grid):
+        with pytest.raises(ValueError):
+            adjacencies(four_square_grid, snap_magnitude=-6)
+
+    def test_raises_for_invalid_method(self, four_square_grid):
+        with pytest.raises(ValueError):
+            adjacencies(four_square_grid, method="bishop")
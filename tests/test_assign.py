@@ -54,6 +54,19 @@ def test_assigns_na_to_geometries_not_fitting_into_any_others(
     assert result == {(0, "a"), (1, "a"), (2, "b"), (3, nan)}
 
 
+def test_assign_by_covering_leaves_sources_covered_by_several_targets_unassigned(
+    four_square_grid, big_square
+):
+    targets = geopandas.GeoSeries(
+        list(four_square_grid.geometry) + list(big_square), crs=big_square.crs
+    )
+    sources = four_square_grid.geometry.scale(0.5, 0.5)
+
+    result = assign_by_covering(sources, targets)
+
+    assert result.isna().all()
+
+
 def test_assign_can_be_used_with_groupby(four_square_grid, squares_df):
     assignment = assign_by_covering(squares_df, four_square_grid.set_index("ID"))
 
@@ -158,3 +171,17 @@ def test_example_case():
     assert (precincts[columns] > 0).sum().sum() > len(precincts)
     for col in columns:  # fails because it does not neatly cover
         assert abs(precincts[col].sum() - blocks[col].sum()) / blocks[col].sum() < 0.5
+
+
+def test_assign_to_targets_with_a_multiindex(four_square_grid, squares_df):
+    targets = four_square_grid.set_index(["ID", four_square_grid.index])
+    assignment = assign_by_covering(squares_df, targets)
+    assert list(assignment) == [("a", 0), ("a", 0), ("b", 1), ("d", 3)]
+
+
+def test_assign_with_n_jobs_matches_serial(
+    four_square_grid, squares_some_neat_some_overlapping
+):
+    expected = assign(squares_some_neat_some_overlapping, four_square_grid)
+    result = assign(squares_some_neat_some_overlapping, four_square_grid, n_jobs=2)
+    assert (result == expected).all()
@@ -0,0 +1,77 @@
+import numpy
+import pandas
+import pytest
+
+from maup import assign, intersections, normalize, prorate, AssigmentWarning, Crosswalk
+
+
+@pytest.fixture
+def sources(four_square_grid):
+    sources = four_square_grid.set_index("ID")
+    sources["data1"] = [10, 20, 30, 40]
+    sources["data2"] = [1, 2, 3, 4]
+    return sources
+
+
+@pytest.fixture
+def targets(square_mostly_in_top_left, squares_within_four_square_grid):
+    return pandas.concat(
+        [square_mostly_in_top_left, squares_within_four_square_grid.iloc[[0]]],
+        ignore_index=True,
+    )
+
+
+def test_prorate_by_area_matches_prorate(sources, targets):
+    pieces = intersections(sources, targets, area_cutoff=0)
+    weights = normalize(pieces.area, level=0)
+    expected = prorate(pieces, sources[["data1", "data2"]], weights)
+
+    crosswalk = Crosswalk.from_intersections(sources, targets)
+    result = crosswalk.prorate(sources[["data1", "data2"]])
+
+    assert numpy.allclose(result.loc[expected.index], expected)
+
+
+def test_prorate_with_piece_weights(sources, targets):
+    crosswalk = Crosswalk.from_intersections(sources, targets)
+    weights = pandas.Series(1, index=crosswalk.pairs)
+
+    result = crosswalk.prorate(sources["data1"], weights=weights)
+
+    assert numpy.isclose(result.sum(), sources["data1"].sum())
+
+
+def test_aggregate_matches_groupby_on_assignment(sources, squares_df):
+    crosswalk = Crosswalk.from_assignment(squares_df, sources)
+    result = crosswalk.aggregate(squares_df["data"])
+
+    expected = squares_df["data"].groupby(assign(squares_df, sources)).sum()
+    assert (result.loc[expected.index] == expected).all()
+    assert result.drop(expected.index).eq(0).all()
+
+
+def test_from_intersections_assigns_by_largest_area(sources, targets):
+    targets = targets.scale(1, 0.5, origin=(0, 0))
+    crosswalk = Crosswalk.from_intersections(sources, targets)
+
+    with pytest.warns(AssigmentWarning):
+        expected = assign(sources, targets)
+    assigned = crosswalk.assignment >= 0
+    assert (assigned == expected.notna()).all()
+    assert (
+        crosswalk.targets[crosswalk.assignment[assigned]] == expected.dropna()
+    ).all()
+
+
+def test_save_and_load(sources, targets, tmp_path):
+    crosswalk = Crosswalk.from_intersections(sources, targets)
+    crosswalk.save(tmp_path / "crosswalk.npz")
+    loaded = Crosswalk.load(tmp_path / "crosswalk.npz")
+
+    assert (loaded.pairs == crosswalk.pairs).all()
+    assert (loaded.sources == crosswalk.sources).all()
+    assert loaded.sources.name == "ID"
+    pandas.testing.assert_frame_equal(
+        loaded.prorate(sources[["data1", "data2"]]),
+        crosswalk.prorate(sources[["data1", "data2"]]),
+    )
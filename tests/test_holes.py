@@ -2,7 +2,7 @@ from itertools import product
 
 import geopandas
 import pytest
-from shapely.geometry import Point, Polygon
+from shapely.geometry import MultiPolygon, Point, Polygon
 
 from maup.repair import (
     close_gaps,
@@ -92,6 +92,88 @@ class TestHoles:
             result[1].equals(squares[0]) and result[0].equals(squares[1])
         )
 
+    def test_chunked_union_finds_the_same_holes(self):
+        # 00000
+        # 0 0 0
+        # 00000
+        geometries = geopandas.GeoSeries(
+            [
+                square_at(point)
+                for point in product([0, 1, 2, 3, 4], [0, 1, 2])
+                if point not in [(1, 1), (3, 1)]
+            ]
+        )
+        result = holes_of_union(geometries, chunk_size=2)
+        assert len(result) == 2
+        assert result.union_all().equals(square_at((1, 1)).union(square_at((3, 1))))
+
+    def test_overlapping_geometries(self):
+        # The coverage union can't be used when the geometries overlap.
+        geometries = geopandas.GeoSeries(
+            [
+                Polygon([(0, 0), (3, 0), (3, 1), (0, 1)]),
+                Polygon([(0, 0), (1, 0), (1, 3), (0, 3)]),
+                Polygon([(0, 2), (3, 2), (3, 3), (0, 3)]),
+                Polygon([(2, 0), (3, 0), (3, 3), (2, 3)]),
+            ]
+        )
+        result = holes_of_union(geometries)
+        assert len(result) == 1
+        assert result[0].equals(square_at((1, 1)))
+
+    def test_chunked_union_of_overlapping_geometries(self):
+        geometries = geopandas.GeoSeries(
+            [
+                Polygon([(0, 0), (3, 0), (3, 1), (0, 1)]),
+                Polygon([(0, 0), (1, 0), (1, 3), (0, 3)]),
+                Polygon([(0, 2), (3, 2), (3, 3), (0, 3)]),
+                Polygon([(2, 0), (3, 0), (3, 3), (2, 3)]),
+            ]
+        )
+        result = holes_of_union(geometries, chunk_size=2)
+        assert len(result) == 1
+        assert result[0].equals(square_at((1, 1)))
+
+    def test_overlapping_precincts(self):
+        precincts = geopandas.read_file(
+            "zip://./examples/Shapefiles/DenverCo_precincts2020_orig.zip"
+        )
+        assert len(holes_of_union(precincts)) == 33
+
+    @pytest.mark.parametrize("chunk_size", [10, 50])
+    def test_chunked_union_finds_the_same_holes_in_overlapping_precincts(
+        self, chunk_size
+    ):
+        # These precincts overlap, and both the plain and the chunked union leave
+        # slivers inside of them, in different places.
+        precincts = geopandas.read_file(
+            "zip://./examples/Shapefiles/DenverCo_precincts2020_orig.zip"
+        )
+        expected = holes_of_union(precincts, drop_covered=True)
+        result = holes_of_union(precincts, chunk_size=chunk_size, drop_covered=True)
+        assert len(expected) == 32
+        assert len(result) == len(expected)
+        assert result.union_all().equals(expected.union_all())
+
+    def test_holes_of_multipolygon_parts(self):
+        outer = [(0, 0), (10, 0), (10, 10), (0, 10)]
+        polygon_with_two_holes = Polygon(
+            outer,
+            holes=[
+                square_at((1, 1)).exterior.coords,
+                square_at((5, 5)).exterior.coords,
+            ],
+        )
+        polygon_with_one_hole = Polygon(
+            [(20, 0), (30, 0), (30, 10), (20, 10)],
+            holes=[square_at((21, 1)).exterior.coords],
+        )
+        result = holes(MultiPolygon([polygon_with_two_holes, polygon_with_one_hole]))
+        assert len(result) == 3
+        assert result[0].equals(square_at((1, 1)))
+        assert result[1].equals(square_at((5, 5)))
+        assert result[2].equals(square_at((21, 1)))
+
     def test_raises_for_non_polygons(self):
         has_a_point = geopandas.GeoSeries([Point((0, 0)), square_at((0, 0))])
         with pytest.raises(TypeError):
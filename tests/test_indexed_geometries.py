@@ -3,8 +3,10 @@ from unittest.mock import patch
 
 from geopandas import GeoSeries
 from shapely import wkt
+from shapely.strtree import STRtree
 
 from maup import IndexedGeometries
+from maup.parallel import intersections_kernel
 
 
 def test_indexed_can_be_created_from_a_dataframe(four_square_grid):
@@ -81,3 +83,44 @@ def test_covered_by_method_returns_empty_when_not_covered_by_any(
     indexed = IndexedGeometries(four_square_grid)
     covered = indexed.covered_by(square)
     assert len(covered) == 0
+
+
+def test_enumerate_intersections_matches_per_target_intersections(
+    four_square_grid, squares_some_neat_some_overlapping
+):
+    indexed = IndexedGeometries(four_square_grid)
+    result = {
+        (i, j): geometry
+        for i, j, geometry in indexed.enumerate_intersections(
+            squares_some_neat_some_overlapping
+        )
+    }
+
+    expected = {
+        (i, j): geometry
+        for i, target in squares_some_neat_some_overlapping.items()
+        for j, geometry in indexed.intersections(target).items()
+    }
+
+    assert set(result) == set(expected)
+    for key, geometry in expected.items():
+        assert result[key].equals(geometry)
+
+
+def test_intersections_kernel_reports_progress_per_batch(
+    four_square_grid, squares_some_neat_some_overlapping
+):
+    sources = np.asarray(four_square_grid.geometry.values)
+    targets = np.asarray(squares_some_neat_some_overlapping.values)
+    tree = STRtree(sources)
+    positions = np.arange(len(targets))
+    expected = intersections_kernel(tree, sources, targets, positions)
+
+    with patch("maup.parallel.progress") as progress:
+        progress.side_effect = lambda batches, total: batches
+        result = intersections_kernel(tree, sources, targets, positions, batch_size=2)
+
+    (batches, total), _ = progress.call_args
+    assert total == len(batches) > 1
+    assert (result[0] == expected[0]).all() and (result[1] == expected[1]).all()
+    assert all(a.equals(b) for a, b in zip(result[2], expected[2]))
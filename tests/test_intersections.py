@@ -63,6 +63,33 @@ class TestIntersections:
         inters = intersections(sources, targets)
         assert inters.crs == crs
 
+    def test_areas_output_matches_geometry_areas(self, sources, targets_with_str_index):
+        expected = intersections(sources, targets_with_str_index).area
+        result = intersections(sources, targets_with_str_index, output_type="areas")
+
+        assert not isinstance(result, geopandas.GeoSeries)
+        assert (result.index == expected.index).all()
+        assert (result == expected).all()
+
+    def test_areas_output_can_use_area_cutoff(self, sources, targets):
+        expected = intersections(sources, targets, area_cutoff=0).area
+        result = intersections(sources, targets, output_type="areas", area_cutoff=0)
+        assert (result.index == expected.index).all()
+        assert (result == expected).all()
+
+    def test_n_jobs_gives_the_same_result(self, sources, targets_with_str_index):
+        expected = intersections(sources, targets_with_str_index)
+        result = intersections(sources, targets_with_str_index, n_jobs=2)
+
+        assert (result.index == expected.index).all()
+        assert result.geom_equals_exact(expected, tolerance=0).all()
+
+    def test_n_jobs_gives_the_same_areas(self, sources, targets):
+        expected = intersections(sources, targets, output_type="areas")
+        result = intersections(sources, targets, output_type="areas", n_jobs=2)
+        assert (result.index == expected.index).all()
+        assert (result == expected).all()
+
 
 def manually_compute_intersections(sources, targets):
     records = []
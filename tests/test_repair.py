@@ -3,6 +3,8 @@ import maup
 from maup.repair import count_overlaps, autorepair, quick_repair
 from maup.assign import AssigmentWarning
 import pytest
+import shapely
+from shapely.geometry import LineString, Polygon
 
 # These tests are losely based off the test_example_case in test_prorate.py
 
@@ -56,6 +58,56 @@ def test_snap_shp_to_grid():
     assert maup.snap_to_grid(shp).all()
 
 
+def test_snap_to_grid_rounds_like_round():
+    shp = geopandas.read_file("zip://./examples/precincts.zip")
+    snapped = maup.snap_to_grid(shp, n=-2)
+
+    assert snapped.crs == shp.crs
+    assert (snapped.index == shp.index).all()
+    for original, result in zip(shp.geometry, snapped):
+        expected = [
+            (round(x, 2), round(y, 2))
+            for x, y in shapely.get_coordinates(original).tolist()
+        ]
+        assert shapely.get_coordinates(result).tolist() == [
+            list(point) for point in expected
+        ]
+
+
+def test_snap_to_grid_rejects_lines():
+    lines = geopandas.GeoSeries([LineString([(0, 0), (1, 1)])])
+    with pytest.raises(TypeError):
+        maup.snap_to_grid(lines)
+
+
+def test_remove_repeated_vertices():
+    square = Polygon(
+        [(0, 0), (1, 0), (1, 0), (1, 1), (0, 1), (0, 1), (0, 0)],
+        holes=[[(0.25, 0.25), (0.5, 0.25), (0.5, 0.25), (0.5, 0.5), (0.25, 0.25)]],
+    )
+    line = LineString([(0, 0), (0, 0), (1, 1)])
+    geometries = geopandas.GeoSeries([square, line], index=["a", "b"], crs="EPSG:4269")
+
+    deduped = maup.repair.remove_repeated_vertices(geometries)
+
+    assert deduped.crs == geometries.crs
+    assert list(deduped.index) == ["a", "b"]
+    assert list(deduped["a"].exterior.coords) == [
+        (0, 0),
+        (1, 0),
+        (1, 1),
+        (0, 1),
+        (0, 0),
+    ]
+    assert list(deduped["a"].interiors[0].coords) == [
+        (0.25, 0.25),
+        (0.5, 0.25),
+        (0.5, 0.5),
+        (0.25, 0.25),
+    ]
+    assert deduped["b"].equals_exact(line, 0)
+
+
 def test_crop_to():
     blocks = geopandas.read_file("zip://./examples/blocks.zip")
     old_precincts = geopandas.read_file("zip://./examples/precincts.zip")
@@ -107,6 +159,27 @@ def test_crop_to():
     assert diff_sum >= 0
 
 
+def test_remove_overlaps_only_touches_overlapping_geometries():
+    geometries = geopandas.GeoSeries(
+        [
+            Polygon([(0, 0), (2, 0), (2, 1), (0, 1)]),
+            Polygon([(1.9, 0), (4, 0), (4, 1), (1.9, 1)]),
+            Polygon([(10, 10), (11, 10), (11, 11), (10, 11)]),
+        ],
+        index=["a", "b", "c"],
+        crs="EPSG:5070",
+    )
+    overlaps = geometries.iloc[[0]].intersection(geometries.iloc[[1]], align=False)
+
+    removed = maup.repair.remove_overlaps(geometries, overlaps)
+
+    assert removed.crs == geometries.crs
+    assert list(removed.index) == ["a", "b", "c"]
+    assert removed["a"].equals(Polygon([(0, 0), (1.9, 0), (1.9, 1), (0, 1)]))
+    assert removed["b"].equals(Polygon([(2, 0), (4, 0), (4, 1), (2, 1)]))
+    assert removed["c"].equals_exact(geometries["c"], 0)
+
+
 # TODO: fix and add more tests
 # def test_snap_autorepair_MI():
 #     shp = geopandas.read_file("zip://./examples/MI.zip") # MI shapefile
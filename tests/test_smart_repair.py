@@ -1,12 +1,30 @@
 import random
 import geopandas
 import maup
+import numpy
 import pytest
-from shapely.geometry import Point, Polygon
+import shapely
+from shapely.geometry import GeometryCollection, LineString, Point, Polygon, box
 
 from maup import assign, doctor
 from maup.adjacencies import adjacencies
-from maup.smart_repair import smart_repair
+from maup.smart_repair import (
+    GeoDataFrameBuilder,
+    SegmentIndex,
+    add_pieces_in_turn,
+    building_blocks,
+    construct_hole_boundaries,
+    convexify_hole_boundaries,
+    drop_bad_holes,
+    hole_conflict_classes,
+    largest_shared_perimeters,
+    make_valid_polygons,
+    reconstruct_from_overlap_tower,
+    segment_key,
+    shortest_path_in_polygon,
+    smart_repair,
+    triangulate_polygon,
+)
 
 
 @pytest.fixture
@@ -96,6 +114,34 @@ class TestSmartRepair:
         assert isinstance(repaired_gs, geopandas.GeoSeries)
         assert doctor(repaired_gs)
 
+    def test_smart_repair_without_tiles_matches_previous_results(
+        self, toy_precincts_geodataframe
+    ):
+        # The areas of the repaired toy precincts before tiles were added, which
+        # shouldn't change for callers who don't use tiles.
+        repaired_gdf = smart_repair(toy_precincts_geodataframe)
+        assert list(repaired_gdf.area) == pytest.approx(
+            [
+                0.228220022169,
+                0.262160950548,
+                0.248896825891,
+                0.24800315435,
+                0.255551071148,
+                0.240707161725,
+                0.25436931048,
+                0.245380947033,
+                0.251891928753,
+                0.246348172247,
+                0.253728290995,
+                0.238934779912,
+                0.224982631623,
+                0.238910353047,
+                0.231558016088,
+                0.247975641747,
+            ],
+            abs=1e-10,
+        )
+
     def test_nest_within_regions(
         self, toy_precincts_geodataframe, toy_counties_geodataframe
     ):
@@ -108,6 +154,36 @@ class TestSmartRepair:
                 repaired_with_regions_gdf.geometry[p]
             )
 
+    def test_nest_within_regions_matches_previous_results(
+        self, toy_precincts_geodataframe, toy_counties_geodataframe
+    ):
+        # The areas of the repaired toy precincts before the overlap tower was stored
+        # in arrays.
+        repaired_with_regions_gdf = smart_repair(
+            toy_precincts_geodataframe, nest_within_regions=toy_counties_geodataframe
+        )
+        assert list(repaired_with_regions_gdf.area) == pytest.approx(
+            [
+                0.242462778835,
+                0.257749486131,
+                0.25573663173,
+                0.243451543978,
+                0.254744919352,
+                0.245042815682,
+                0.251475273161,
+                0.249336551132,
+                0.255605031699,
+                0.247636623826,
+                0.252009326467,
+                0.247987513928,
+                0.240750341106,
+                0.256008003369,
+                0.24124366101,
+                0.258759498595,
+            ],
+            abs=1e-10,
+        )
+
     def test_small_rook_to_queen(self, toy_precincts_geodataframe):
         repaired_basic_gdf = smart_repair(toy_precincts_geodataframe)
         assert min(adjacencies(repaired_basic_gdf).length) < 0.05
@@ -118,5 +194,284 @@ class TestSmartRepair:
         assert min(adjacencies(repaired_srtq_gdf).length) > 0.05
 
 
+def test_building_blocks_labels_pieces_by_overlap():
+    squares = geopandas.GeoDataFrame(
+        geometry=geopandas.GeoSeries(
+            [
+                Polygon([(0, 0), (2, 0), (2, 2), (0, 2)]),
+                Polygon([(1, 1), (3, 1), (3, 3), (1, 3)]),
+            ],
+            index=["a", "b"],
+        )
+    )
+    overlap_tower, holes_df = building_blocks(squares)
+
+    assert overlap_tower.max_degree == 2
+    assert sorted(overlap_tower.members_of(i) for i in overlap_tower.level(1)) == [
+        ["a"],
+        ["b"],
+    ]
+    [overlap] = overlap_tower.level(2)
+    assert sorted(overlap_tower.members_of(overlap)) == ["a", "b"]
+    assert overlap_tower.geometries[overlap].equals(
+        Polygon([(1, 1), (2, 1), (2, 2), (1, 2)])
+    )
+    assert len(holes_df) == 0
+
+
+def test_smart_repair_n_jobs_matches_serial(
+    toy_precincts_geodataframe, toy_counties_geodataframe
+):
+    serial = smart_repair(
+        toy_precincts_geodataframe, nest_within_regions=toy_counties_geodataframe
+    )
+    parallel = smart_repair(
+        toy_precincts_geodataframe,
+        nest_within_regions=toy_counties_geodataframe,
+        n_jobs=2,
+    )
+    assert parallel.geometry.geom_equals_exact(serial.geometry, 0).all()
+
+
+def test_smart_repair_fills_gaps_in_parallel(toy_precincts_geodataframe):
+    serial = smart_repair(toy_precincts_geodataframe)
+    parallel = smart_repair(toy_precincts_geodataframe, n_jobs=2)
+    assert parallel.geometry.geom_equals(serial.geometry).all()
+
+
+@pytest.mark.parametrize("nested", [False, True])
+def test_smart_repair_workers_do_not_write_to_stderr(
+    toy_precincts_geodataframe, toy_counties_geodataframe, nested, capfd
+):
+    regions = toy_counties_geodataframe if nested else None
+    smart_repair(toy_precincts_geodataframe, nest_within_regions=regions)
+    assert "Gaps to fill" in capfd.readouterr().err
+
+    smart_repair(toy_precincts_geodataframe, nest_within_regions=regions, n_jobs=2)
+    assert capfd.readouterr().err == ""
+
+
+def test_hole_conflict_classes_separate_holes_with_a_common_geometry():
+    # Three geometries in a row, with a hole between each pair and one more hole
+    # far away from the others' geometries.
+    geometries_df = geopandas.GeoDataFrame(
+        geometry=geopandas.GeoSeries(
+            [
+                Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]),
+                Polygon([(2, 0), (3, 0), (3, 1), (2, 1)]),
+                Polygon([(4, 0), (5, 0), (5, 1), (4, 1)]),
+                Polygon([(10, 0), (11, 0), (11, 1), (10, 1)]),
+            ]
+        )
+    )
+    holes_df = geopandas.GeoDataFrame(
+        geometry=geopandas.GeoSeries(
+            [
+                Polygon([(1, 0), (2, 0), (2, 1), (1, 1)]),
+                Polygon([(3, 0), (4, 0), (4, 1), (3, 1)]),
+                Polygon([(11, 0), (12, 0), (12, 1), (11, 1)]),
+            ]
+        )
+    )
+
+    classes = hole_conflict_classes(geometries_df, holes_df)
+
+    assert sorted(len(hole_class) for hole_class in classes) == [1, 2]
+    for hole_class in classes:
+        assert not {0, 1} <= set(hole_class.tolist())
+
+
+@pytest.mark.parametrize(
+    "tiles", [{"tiles": 1}, {"tiles": 3}, {"tiles": (4, 1)}, {"tile_size": 0.5}]
+)
+@pytest.mark.parametrize("nested", [False, True])
+def test_smart_repair_with_tiles_matches_smart_repair_without_tiles(
+    toy_precincts_geodataframe, toy_counties_geodataframe, tiles, nested
+):
+    regions = toy_counties_geodataframe if nested else None
+    repair = smart_repair(toy_precincts_geodataframe, nest_within_regions=regions)
+    tiled_repair = smart_repair(
+        toy_precincts_geodataframe, nest_within_regions=regions, **tiles
+    )
+    assert tiled_repair.geometry.geom_equals_exact(repair.geometry, 0).all()
+    assert doctor(tiled_repair)
+
+
+@pytest.mark.parametrize("tiles", [{"tiles": 1}, {"tiles": 3}])
+def test_building_blocks_with_tiles_finds_the_same_pieces(
+    toy_precincts_geodataframe, tiles
+):
+    overlap_tower, holes_df = building_blocks(toy_precincts_geodataframe)
+    tiled_overlap_tower, tiled_holes_df = building_blocks(
+        toy_precincts_geodataframe, **tiles
+    )
+
+    assert shapely.equals_exact(
+        tiled_overlap_tower.geometries, overlap_tower.geometries, 0
+    ).all()
+    assert tiled_overlap_tower.members.tolist() == overlap_tower.members.tolist()
+    assert tiled_holes_df.geometry.geom_equals_exact(holes_df.geometry, 0).all()
+
+
+def test_make_valid_polygons_keeps_only_polygonal_parts():
+    bowtie = Polygon([(0, 0), (2, 2), (2, 0), (0, 2)])
+    collection = GeometryCollection(
+        [LineString([(5, 5), (6, 6)]), Polygon([(0, 0), (1, 0), (1, 1)])]
+    )
+    valid = make_valid_polygons(geopandas.GeoSeries([bowtie, None, collection]))
+
+    assert valid[0].geom_type == "MultiPolygon" and valid[0].area == 2
+    assert valid[1].equals(Polygon())
+    assert valid[2].equals(Polygon([(0, 0), (1, 0), (1, 1)]))
+
+
+def test_overlaps_are_compared_with_the_polygons_as_they_grow():
+    # The overlap of A and C goes to A, after which the overlap of A and B shares
+    # more perimeter with A than with B, even though it didn't touch A at first.
+    geometries_df = geopandas.GeoDataFrame(
+        geometry=[
+            box(0, 0, 3, 1).union(box(-2, -2, 3, -1.9)),
+            box(0, 0, 1, 1).union(box(-1, 0, 0, 0.2)),
+            box(1, 0, 2, 1).union(box(1, 1, 1.2, 2)),
+        ],
+        index=["A", "B", "C"],
+    )
+    overlap_tower, holes_df = building_blocks(geometries_df)
+    reconstructed_df = reconstruct_from_overlap_tower(geometries_df, overlap_tower)
+
+    assert list(reconstructed_df.area) == pytest.approx([3.5, 0.2, 0.2])
+
+
+def test_add_pieces_in_turn_matches_unions_one_at_a_time():
+    geometries = numpy.array([Polygon(), box(0, 0, 1, 1), box(5, 5, 6, 6)])
+    pieces = numpy.array(
+        [box(1, 0, 2, 1), box(0, 0, 1, 2), box(2, 0, 3, 0.5), box(0, 2, 1, 3)]
+    )
+    owners = numpy.array([1, 0, 1, 0])
+
+    expected = list(geometries)
+    for piece, owner in zip(pieces, owners):
+        expected[owner] = shapely.union_all([expected[owner], piece])
+    add_pieces_in_turn(geometries, pieces, owners)
+
+    for result, geometry in zip(geometries, expected):
+        assert result.equals_exact(geometry, 0)
+
+
+def test_largest_shared_perimeters_picks_longest_shared_boundary():
+    pieces = numpy.array(
+        [
+            Polygon([(1, 0), (2, 0), (2, 1), (1, 1)]),
+            Polygon([(5, 5), (6, 5), (6, 6), (5, 6)]),
+        ]
+    )
+    geometries = numpy.array(
+        [
+            Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]),
+            Polygon([(2, 0), (3, 0), (3, 1), (2, 1)]).union(
+                Polygon([(1, 1), (3, 1), (3, 2), (1, 2)])
+            ),
+        ]
+    )
+    winners = largest_shared_perimeters(
+        pieces, geometries, numpy.array([0, 0, 1, 1]), numpy.array([0, 1, 0, 1])
+    )
+    assert list(winners) == [1, -1]
+
+
+def test_segment_index_stays_current_while_filling_gaps(toy_precincts_geodataframe):
+    overlap_tower, holes_df = building_blocks(toy_precincts_geodataframe)
+    geometries_df = reconstruct_from_overlap_tower(
+        toy_precincts_geodataframe, overlap_tower
+    )
+    holes_df, _, _ = drop_bad_holes(geometries_df, holes_df, 0.1)
+    segment_index = SegmentIndex(geometries_df["geometry"])
+
+    filled_df, _ = convexify_hole_boundaries(geometries_df, holes_df, segment_index)
+    assert not filled_df.geometry.geom_equals_exact(geometries_df.geometry, 0).all()
+
+    # Every geometry that absorbed part of a gap is re-indexed, so the index ends up
+    # the same as one built from scratch.
+    segment_index.refresh(filled_df["geometry"])
+    fresh_index = SegmentIndex(filled_df["geometry"])
+    assert segment_index.owners == fresh_index.owners
+
+
+def test_geodataframe_builder():
+    builder = GeoDataFrameBuilder(["region", "geometry"], crs="EPSG:5070")
+    assert builder.finalize().empty
+
+    builder.append(region="a", geometry=Point(0, 0))
+    builder.extend(geometry=[Point(1, 1), Point(2, 2)], region="b")
+    builder.extend(geometry=[Point(3, 3)], region=["c"])
+    assert len(builder) == 4
+
+    result = builder.finalize()
+    assert isinstance(result, geopandas.GeoDataFrame)
+    assert result.crs == "EPSG:5070"
+    assert list(result.columns) == ["region", "geometry"]
+    assert list(result.index) == [0, 1, 2, 3]
+    assert list(result["region"]) == ["a", "b", "b", "c"]
+    assert result.geometry[2].equals(Point(2, 2))
+
+
+def test_construct_hole_boundaries_with_segment_index():
+    pacman = Polygon([(0, 0), (0, 3), (2, 3), (2, 2), (1, 2), (1, 1), (2, 1), (2, 0)])
+    bar = Polygon([(2, 0), (2, 1), (2, 2), (2, 3), (3, 3), (3, 0)])
+    geometries_df = geopandas.GeoDataFrame(
+        geometry=geopandas.GeoSeries([pacman, bar], index=["pacman", "bar"])
+    )
+    hole = Polygon([(1, 1), (2, 1), (2, 2), (1, 2)])
+    holes_df = geopandas.GeoDataFrame(geometry=geopandas.GeoSeries([hole]))
+    segment_index = SegmentIndex(geometries_df["geometry"])
+
+    boundaries_df = construct_hole_boundaries(geometries_df, holes_df, segment_index)
+
+    assert list(boundaries_df["target"]) == ["pacman", "bar"]
+    assert boundaries_df.geometry[0].length == 3
+    assert boundaries_df.geometry[1].equals(LineString([(2, 1), (2, 2)]))
+
+    # Filling the hole replaces pacman, which the index picks up on the next lookup:
+    geometries_df.loc["pacman", "geometry"] = pacman.union(hole)
+    segment_index.refresh(geometries_df["geometry"])
+    assert segment_index.owners_of(segment_key((1, 1), (1, 2))) == set()
+    assert segment_index.owners_of(segment_key((2, 2), (2, 1))) == {"pacman", "bar"}
+
+
+def test_triangulate_polygon_uses_only_polygon_vertices():
+    # A comb with 5 teeth:
+    comb = Polygon(
+        [(0, 0), (10, 0)]
+        + [
+            point
+            for k in range(5, 0, -1)
+            for point in [(2 * k, 3), (2 * k - 1, 3), (2 * k - 1, 1), (2 * k - 2, 1)]
+        ]
+    )
+    triangles = triangulate_polygon(comb)
+
+    assert len(triangles) == len(comb.exterior.coords) - 3
+    assert sum(triangle.area for triangle in triangles) == pytest.approx(comb.area)
+    vertices = set(comb.exterior.coords)
+    for triangle in triangles:
+        assert comb.contains(triangle)
+        assert set(triangle.exterior.coords) <= vertices
+
+
+def test_shortest_path_in_polygon_bends_around_reflex_vertices():
+    # A U shape; the path from the top of one arm to the top of the other has to go
+    # around the inner corners.
+    u_shape = Polygon([(0, 0), (3, 0), (3, 3), (2, 3), (2, 1), (1, 1), (1, 3), (0, 3)])
+
+    path = shortest_path_in_polygon(u_shape, Point(0, 3), Point(3, 3))
+
+    assert [point.coords[0] for point in path] == [
+        (0, 3),
+        (1, 1),
+        (2, 1),
+        (3, 3),
+    ]
+
+
 # There should also be a lot of unit tests for all the component functions,
 # but this could mushroom into a BIG project that will have to wait for another day!
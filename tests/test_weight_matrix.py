@@ -0,0 +1,59 @@
+import numpy
+import pandas
+import pytest
+
+from maup import intersections, prorate, WeightMatrix
+
+
+@pytest.fixture
+def weights():
+    index = pandas.MultiIndex.from_tuples(
+        [(0, "a"), (0, "b"), (1, "b"), (2, "b"), (2, "c")],
+        names=["source", "target"],
+    )
+    return pandas.Series([1.0, 3.0, 2.0, 0.0, 0.0], index=index)
+
+
+def test_from_series_reads_sources_and_targets(weights):
+    matrix = WeightMatrix.from_series(weights)
+    assert list(matrix.sources) == [0, 1, 2]
+    assert list(matrix.targets) == ["a", "b", "c"]
+    assert matrix.shape == (3, 3)
+    assert len(matrix) == 5
+
+
+def test_normalize_by_source(weights):
+    matrix = WeightMatrix.from_series(weights).normalize(by="source")
+    assert numpy.allclose(matrix.weights, [0.25, 0.75, 1, 0, 0])
+
+
+def test_normalize_raises_for_invalid_axis(weights):
+    with pytest.raises(ValueError):
+        WeightMatrix.from_series(weights).normalize(by="neither")
+
+
+def test_prorate_moves_every_column_at_once(weights):
+    data = pandas.DataFrame({"x": [4, 10, 7], "y": [8, 0, numpy.nan]})
+    result = WeightMatrix.from_series(weights).prorate(data)
+
+    expected = pandas.DataFrame(
+        {"x": [4.0, 32.0, 0.0], "y": [8.0, 24.0, 0.0]},
+        index=pandas.Index(["a", "b", "c"], name="target"),
+    )
+    pandas.testing.assert_frame_equal(result, expected)
+
+
+def test_prorate_matches_groupby_aggregation(
+    four_square_grid, square_mostly_in_top_left
+):
+    sources = four_square_grid
+    sources["data"] = [1, 2, 3, 4]
+    pieces = intersections(sources, square_mostly_in_top_left)
+    weights = pieces.area / pieces.index.get_level_values("source").map(sources.area)
+
+    result = prorate(pieces, sources[["data"]], weights)
+    expected = prorate(
+        pieces, sources[["data"]], weights, aggregate_by=lambda values: values.sum()
+    )
+
+    assert numpy.allclose(result["data"], expected["data"])